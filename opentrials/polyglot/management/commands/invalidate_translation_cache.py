@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from polyglot.models import TranslationManager
+
+class Command(BaseCommand):
+    help = "Drops the cached translations of the given models (app_label.Model), i.e. after a bulk import"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='+', help="Translated models, as app_label.Model")
+
+    def handle(self, models=(), **options):
+        for name in models:
+            try:
+                model = apps.get_model(name)
+            except (LookupError, ValueError):
+                raise CommandError('Unknown model: %s' % name)
+
+            # the version doesn't depend on the translation model
+            TranslationManager().invalidate_model(model)
+            self.stdout.write('Cached translations of %s invalidated' % name)
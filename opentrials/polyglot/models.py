@@ -17,6 +17,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+import time
+
 from django.db import models
 
 from django.contrib.contenttypes import generic
@@ -24,22 +27,93 @@ from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.exceptions import ObjectDoesNotExist
 
 lang_format = lambda lang: lang.replace('_','-').lower()
 CHOICES_TARGET_LANGUAGES = [(lang_format(value), label) for value, label in settings.TARGET_LANGUAGES]
 MANAGED_LANGUAGES_LOWER = map(lang_format, settings.MANAGED_LANGUAGES)
 
+# cached in place of the translations that don't exist
+NO_TRANSLATION = 'polyglot:no-translation'
+
+# timeouts (in seconds) of cached translations and of cached missing ones
+CACHE_TIMEOUT = getattr(settings, 'POLYGLOT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+NEGATIVE_CACHE_TIMEOUT = getattr(settings, 'POLYGLOT_NEGATIVE_CACHE_TIMEOUT', 60 * 10)
+
+class TranslationCacheStats(object):
+    """Counters of the translation lookups of this process, by cache outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def count(self, hits=0, negative_hits=0, misses=0):
+        with self._lock:
+            self.hits += hits
+            self.negative_hits += negative_hits
+            self.misses += misses
+
+    def clear(self):
+        with self._lock:
+            self.hits = 0
+            self.negative_hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            }
+
+cache_stats = TranslationCacheStats()
+
 class TranslationManager(models.Manager):
-    def make_cache_key(self, model, object_id, lang):
+    def make_version_key(self, model):
+        return 'polyglot:version:%s.%s'%(model._meta.app_label, model.__name__)
+
+    def get_model_version(self, model):
+        """Returns the current version of the cached translations of a model.
+
+        A missing version (never set or evicted) starts from the current time,
+        so it never matches the keys of an earlier version."""
+
+        version_key = self.make_version_key(model)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, int(time.time() * 1000), None)
+            version = cache.get(version_key)
+        return version
+
+    def invalidate_model(self, model):
+        """Drops the cached translations of all objects of a model at once (i.e.
+        after a bulk import), by moving to a new version of their keys."""
+
+        try:
+            cache.incr(self.make_version_key(model))
+        except ValueError:
+            self.get_model_version(model)
+
+    def make_cache_key(self, model, object_id, lang, version=None):
         """Returns a string with the key used to store translation object in the cache.
         
         This is used also to do cache invalidation for this object when changed."""
 
-        return 'polyglot:translation:%s.%s|%s|%s'%(
-                model._meta.app_label, model.__name__, object_id, lang,
+        if version is None:
+            version = self.get_model_version(model)
+
+        return 'polyglot:translation:%s.%s:v%s|%s|%s'%(
+                model._meta.app_label, model.__name__, version, object_id, lang,
                 )
 
+    def cache_translation(self, cache_key, trans):
+        """Stores a translation (or NO_TRANSLATION) in the cache"""
+        if trans == NO_TRANSLATION:
+            cache.set(cache_key, trans, NEGATIVE_CACHE_TIMEOUT)
+        else:
+            cache.set(cache_key, trans, CACHE_TIMEOUT)
+
     def get_translation_for_object(self, lang, obj=None, model=None, object_id=None,
             returns_default=False, create_if_not_exist=False):
         """Returns the translation object for a given object and language.
@@ -59,9 +133,19 @@ class TranslationManager(models.Manager):
         # Checks if there is a cached object for this
         from_cache = cache.get(cache_key, None)
 
-        if from_cache:
+        if from_cache == NO_TRANSLATION:
+            # a missing translation to be created goes on to the database
+            if not create_if_not_exist:
+                cache_stats.count(negative_hits=1)
+                if returns_default:
+                    return obj
+                raise self.model.DoesNotExist
+        elif from_cache:
+            cache_stats.count(hits=1)
             return from_cache
 
+        cache_stats.count(misses=1)
+
         # Gets the related content type
         c_type = ContentType.objects.get_for_model(model)
 
@@ -71,17 +155,62 @@ class TranslationManager(models.Manager):
         except ObjectDoesNotExist:
             if create_if_not_exist:
                 trans = self.create(language=lang, content_type=c_type, object_id=object_id)
-            elif returns_default:
-                return obj
             else:
+                # Missing translations are cached too
+                self.cache_translation(cache_key, NO_TRANSLATION)
+                if returns_default:
+                    return obj
                 raise
 
         # Stores in cache
-        cache.set(cache_key, trans)
+        self.cache_translation(cache_key, trans)
 
         # Returns the translation object
         return trans
 
+    def get_translations_for_objects(self, model, ids, lang):
+        """Returns a dictionary (object id -> translation object) with the
+        translations of many objects of a model in a given language.
+
+        Objects without a translation are left out. It takes a single cache
+        round trip and, for the objects not cached, a single query."""
+
+        lang = lang_format(lang)
+        version = self.get_model_version(model)
+
+        keys = dict((self.make_cache_key(model, object_id, lang, version), object_id)
+                    for object_id in set(ids) if object_id is not None)
+        if not keys:
+            return {}
+
+        from_cache = cache.get_many(list(keys.keys()))
+
+        translations = dict((keys[key], trans) for key, trans in from_cache.items()
+                            if trans != NO_TRANSLATION)
+
+        missing = [object_id for key, object_id in keys.items() if key not in from_cache]
+        cache_stats.count(hits=len(translations),
+                          negative_hits=len(from_cache) - len(translations),
+                          misses=len(missing))
+
+        if missing:
+            c_type = ContentType.objects.get_for_model(model)
+            for trans in self.filter(language__iexact=lang, content_type=c_type, object_id__in=missing):
+                translations[trans.object_id] = trans
+
+            # Back-fills the cache, with the missing translations too (they
+            # expire sooner)
+            found = dict((self.make_cache_key(model, object_id, lang, version), translations[object_id])
+                         for object_id in missing if object_id in translations)
+            not_found = dict((self.make_cache_key(model, object_id, lang, version), NO_TRANSLATION)
+                             for object_id in missing if object_id not in translations)
+            if found:
+                cache.set_many(found, CACHE_TIMEOUT)
+            if not_found:
+                cache.set_many(not_found, NEGATIVE_CACHE_TIMEOUT)
+
+        return translations
+
 class Translation(models.Model):
     language = models.CharField(_('Language'), max_length=8,
                                 blank=False, null=False, db_index=True,
@@ -112,6 +241,15 @@ class Translation(models.Model):
         done = set(t.language for t in content_object.translations.all())
         return targets-done
 
+    # language of the row as last loaded or saved
+    _saved_language = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Translation, cls).from_db(db, field_names, values)
+        instance._saved_language = dict(zip(field_names, values)).get('language')
+        return instance
+
     def save(self, *args, **kwargs):
         """This methods intercepts the 'save' method to force cache invalidation
         for this object"""
@@ -120,12 +258,25 @@ class Translation(models.Model):
 
         ret = super(Translation, self).save(*args, **kwargs)
 
-        # Does cache invalidation
-        cache_key = Translation.objects.make_cache_key(type(self), self.object_id, self.language)
-        cache.set(cache_key, self)
+        # Does cache invalidation (keyed by the translated model, as read by
+        # TranslationManager), replacing a cached missing translation. A
+        # translation moved to another language leaves its old key behind.
+        if self._saved_language and self._saved_language != self.language:
+            cache.delete(self.cache_key(self._saved_language))
+        type(self).objects.cache_translation(self.cache_key(), self)
+        self._saved_language = self.language
 
         return ret
 
+    def delete(self, *args, **kwargs):
+        cache.delete(self.cache_key())
+        return super(Translation, self).delete(*args, **kwargs)
+
+    def cache_key(self, language=None):
+        # the content type comes from the cache of ContentType, not the database
+        model = ContentType.objects.get_for_id(self.content_type_id).model_class()
+        return type(self).objects.make_cache_key(model, self.object_id, language or self.language)
+
 def get_multilingual_fields(model):
     """Returns a list of fields are begin translated for a given model class"""
 
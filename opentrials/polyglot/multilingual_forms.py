@@ -22,7 +22,10 @@ try:
 except:
     from sets import Set as set
 
+import threading
+
 from django import forms
+from django.core.signals import request_started, request_finished
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import EMPTY_VALUES
@@ -36,6 +39,34 @@ import re
 
 BLANK_CHOICE = ('', _('Select'))
 
+class RequestChoicesCache(threading.local):
+    """Translated choices of the multilingual selects, kept until the end of a
+    request (nothing is kept outside of requests)"""
+
+    def __init__(self):
+        self.choices = {}
+        self.active = False
+
+    def get(self, key):
+        return self.choices.get(key)
+
+    def set(self, key, choices):
+        if self.active:
+            self.choices[key] = choices
+        return choices
+
+    def start(self, **kwargs):
+        self.choices = {}
+        self.active = True
+
+    def finish(self, **kwargs):
+        self.choices = {}
+        self.active = False
+
+_request_choices = RequestChoicesCache()
+request_started.connect(_request_choices.start, weak=False)
+request_finished.connect(_request_choices.finish, weak=False)
+
 # --------- WIDGETS --------
 
 class BaseMultilingualWidget(forms.Widget):
@@ -133,20 +164,34 @@ class BaseMultilingualSelect(object):
     label_field = None
 
     def get_translated_choices(self):
+        # The same choices are often rendered many times in a request (i.e.
+        # countries of each contact form)
+        key = (self.queryset.model, lang_format(self.display_language),
+               self.label_field, str(self.queryset.query))
+        choices = _request_choices.get(key)
+        if choices is None:
+            choices = _request_choices.set(key, self.build_translated_choices())
+        return list(choices)
+
+    def build_translated_choices(self):
         choices = []
+        language = lang_format(self.display_language)
+
+        # The translations of all items come from a single query
+        items = self.queryset.all().prefetch_related('translations')
 
         # Loops in the model choice objects
-        for item in self.queryset.all():
+        for item in items:
+            item_trans = item
             # If there is a translation...
-            try:
-                item_trans = item.translations.get(language__iexact=self.display_language)
-            # If there is no translation (so the original object is returned)
-            except ObjectDoesNotExist:
-                item_trans = item
+            for trans in item.translations.all():
+                if lang_format(trans.language) == language:
+                    item_trans = trans
+                    break
 
             choices.append((item.pk, getattr(item_trans, self.label_field)))
 
-        return choices
+        return tuple(choices)
 
 class MultilingualSelect(forms.Select, BaseMultilingualSelect):
     def __init__(self, display_language=None, queryset=None, label_field=None, attrs=None):
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.utils.translation import gettext as _
 from django.utils.functional import update_wrapper
 from django.http import HttpResponseRedirect
@@ -63,12 +64,22 @@ class DescriptorAdmin(admin.ModelAdmin):
 class InlineFossilIndexer(admin.TabularInline):
     model = FossilIndexer
 
+class PublishedTrialChangeList(ChangeList):
+    def get_results(self, request):
+        super(PublishedTrialChangeList, self).get_results(request)
+
+        # Loads indexers of the current page at once (used by 'trial_id' column)
+        self.result_list = load_indexers(self.result_list)
+
 class PublishedTrialAdmin(admin.ModelAdmin):
     list_display = ('display_text','creation','trial_id','is_most_recent','revision_sequential')
     list_filter = ('creation','is_most_recent','revision_sequential')
     search_fields = ('display_text','serialized')
     inlines = [InlineFossilIndexer]
 
+    def get_changelist(self, request, **kwargs):
+        return PublishedTrialChangeList
+
     def get_urls(self):
         from django.urls import re_path
 
@@ -0,0 +1,208 @@
+"""
+In-memory prefix index for the autocompletion of the trial search box.
+
+Trial ids, acronyms, primary sponsors and titles (in all languages) of the
+published trials are kept in a sorted list of (key, ...) tuples, where each
+key is the accent folded words of a value starting at one of them, so a
+prefix search is a binary search followed by a short scan.
+
+The index is built from the indexers of the published fossils by a
+background thread, started on the first search of a process (searches find
+nothing until it is loaded). Fossils created in the same process are added
+when their transaction commits (see ClinicalTrial.create_fossil) and the
+thread picks up those created by other processes every REFRESH_INTERVAL
+seconds, when trials no longer published are also dropped.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.db import connection
+from django.db.models import Q
+
+from repository.text_index import fold, WORD_RE
+
+logger = logging.getLogger(__name__)
+
+# indexers completed, in order of priority of their suggestions
+FIELDS = ('trial_id', 'acronym', 'scientific_acronym', 'primary_sponsor',
+          'public_title', 'scientific_title')
+
+MIN_PREFIX_LENGTH = 2
+MAX_RESULTS = 10
+MAX_LABEL_LENGTH = 80
+MAX_WORDS = 12 # words of a value from which it can be completed
+REFRESH_INTERVAL = 60 # seconds
+LOAD_BATCH_SIZE = 500 # fossils whose indexers are loaded at once
+
+def labels(field, value):
+    """Values of an indexer suggested to users (one for each translation)"""
+    if field in ('public_title', 'scientific_title', 'acronym', 'scientific_acronym'):
+        values = value.split('|')
+    else:
+        values = [value]
+    return [label.strip() for label in values if label and label.strip()]
+
+def keys(label):
+    """Folded words of a label starting at each of its first MAX_WORDS words"""
+    words = WORD_RE.findall(fold(label))
+    return [' '.join(words[i:]) for i in range(min(len(words), MAX_WORDS))]
+
+class PrefixIndex(object):
+    """
+    With no ``refresh_interval`` the index is only loaded and refreshed by
+    calling refresh().
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.entries = [] # sorted (key, field priority, label, trial_id) tuples
+        self.by_trial = {} # trial_id -> its entries
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.last_loaded = None # (creation, pk) of the last fossil loaded
+        self.refresh_interval = refresh_interval
+        self._thread = None
+
+    def _remove(self, trial_id):
+        for entry in self.by_trial.pop(trial_id, ()):
+            i = bisect_left(self.entries, entry)
+            if i < len(self.entries) and self.entries[i] == entry:
+                del self.entries[i]
+
+    def _entries_for(self, trial_id, indexers):
+        entries = set()
+        for priority, field in enumerate(FIELDS):
+            value = trial_id if field == 'trial_id' else indexers.get(field)
+            for label in labels(field, value or ''):
+                label = label[:MAX_LABEL_LENGTH]
+                for key in keys(label):
+                    entries.add((key, priority, label, trial_id))
+        return sorted(entries)
+
+    def _add(self, trial_id, indexers):
+        self._remove(trial_id)
+        entries = self._entries_for(trial_id, indexers)
+        for entry in entries:
+            insort(self.entries, entry)
+        self.by_trial[trial_id] = entries
+
+    def _replace(self, removed, added):
+        """
+        Removes the entries of the ``removed`` trial ids and adds (or replaces)
+        those of the ``added`` (trial_id, indexers) tuples, sorting the index once.
+        """
+        removed = set(removed) | set(trial_id for trial_id, indexers in added)
+        entries = [entry for entry in self.entries if entry[3] not in removed]
+        for trial_id in removed:
+            self.by_trial.pop(trial_id, None)
+
+        for trial_id, indexers in added:
+            self.by_trial[trial_id] = self._entries_for(trial_id, indexers)
+            entries.extend(self.by_trial[trial_id])
+
+        entries.sort()
+        self.entries = entries
+
+    def add(self, indexers):
+        """Adds (or replaces) the entries of a trial from the indexers of its new fossil"""
+        if indexers.get('display') != 'True' or not indexers.get('trial_id'):
+            return
+
+        with self.lock:
+            if self.loaded:
+                self._add(indexers['trial_id'], indexers)
+
+    def refresh(self):
+        """
+        Loads the fossils published since the last refresh (all on the first
+        one) and drops the trials no longer published. The database is read
+        without holding the lock, so searches only wait for the index to be
+        updated, when something changed.
+        """
+        from repository.models import ClinicalTrial, load_indexers
+        from fossil.models import FossilIndexer
+
+        with self.lock:
+            known = list(self.by_trial)
+
+        published = ClinicalTrial.fossils.published()
+
+        fossils = published
+        last_loaded = self.last_loaded
+        if last_loaded is not None:
+            creation, pk = last_loaded
+            fossils = fossils.filter(Q(creation__gt=creation) | Q(creation=creation, pk__gt=pk))
+        pks = list(fossils.order_by('creation', 'pk').values_list('pk', flat=True))
+
+        added = []
+        for i in range(0, len(pks), LOAD_BATCH_SIZE):
+            batch = published.filter(pk__in=pks[i:i + LOAD_BATCH_SIZE]).order_by('creation', 'pk')
+            for fossil in load_indexers(batch):
+                if fossil._indexers.get('trial_id'):
+                    added.append((fossil._indexers['trial_id'], fossil._indexers))
+                last_loaded = (fossil.creation, fossil.pk)
+
+        # trials unpublished, or whose last revision isn't displayed
+        removed = []
+        if known:
+            published_ids = set(FossilIndexer.objects.filter(key='trial_id',
+                    fossil__in=published.values('pk')).values_list('value', flat=True))
+            removed = [trial_id for trial_id in known if trial_id not in published_ids]
+
+        with self.lock:
+            if added or removed:
+                self._replace(removed, added)
+            self.last_loaded = last_loaded
+            self.loaded = True
+
+    def start(self):
+        """Starts the thread loading the index and refreshing it, once per process"""
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='prefix-index')
+            self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('Refresh of the autocompletion index failed')
+            finally:
+                # the thread's own connection isn't closed by any request
+                connection.close()
+            time.sleep(self.refresh_interval)
+
+    def search(self, prefix, limit=MAX_RESULTS):
+        """
+        Returns up to ``limit`` (label, trial_id, field) tuples whose label
+        has a word starting with ``prefix``, by field priority.
+        """
+        prefix = ' '.join(WORD_RE.findall(fold(prefix)))
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+
+        if self.refresh_interval and self._thread is None:
+            self.start()
+
+        found = {}
+        with self.lock:
+            entries = self.entries
+            i = bisect_left(entries, (prefix,))
+            # the scan is bounded, so a short prefix can't walk the whole index
+            while i < len(entries) and len(found) < limit * 10:
+                key, priority, label, trial_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if found.get((label, trial_id), priority) >= priority:
+                    found[(label, trial_id)] = priority
+                i += 1
+
+        ranked = sorted(found.items(), key=lambda item: (item[1], len(item[0][0]), item[0]))
+        return [(label, trial_id, FIELDS[priority]) for (label, trial_id), priority in ranked[:limit]]
+
+prefix_index = PrefixIndex()
@@ -17,7 +17,7 @@ class LastRecruiting(Feed):
     link = '/'
 
     def items(self):
-        return ClinicalTrial.fossils.recruiting()
+        return ClinicalTrial.fossils.recruiting().with_indexers()
         
     def item_link(self, trial):
         return '/rg/%s/'%trial.trial_id
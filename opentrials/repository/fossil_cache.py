@@ -0,0 +1,88 @@
+"""
+Process-wide cache of deserialized trial fossils.
+
+A fossil is keyed by the hash of its content, so its serialized data never
+changes and the parsed JSON can be safely shared between requests of the same
+worker. Entries are kept in LRU order and the cache is bounded by the total
+length of the serialized data it holds (FOSSIL_CACHE_MAX_SIZE setting).
+
+Each proxy gets its own copy of the top level dictionary of the parsed data,
+but the values inside it (contacts, translations, outcomes...) are shared
+among all proxies of a fossil, so callers must copy them before changing them.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from repository.serializers import FossilClinicalTrial
+
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024 # characters of serialized JSON
+
+class FossilCache(object):
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict() # fossil pk -> (data, size)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_data(self, fossil):
+        """Returns the parsed serialized data of a given fossil"""
+        with self._lock:
+            entry = self._entries.get(fossil.pk)
+            if entry is not None:
+                self._entries.move_to_end(fossil.pk)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        serialized = fossil.serialized
+        data = json.loads(serialized)
+        self._store(fossil.pk, data, len(serialized))
+
+        return data
+
+    def get_object_fossil(self, fossil):
+        """Returns a new FossilClinicalTrial proxy for a given fossil"""
+        return FossilClinicalTrial(dict(self.get_data(fossil)))
+
+    def _store(self, key, data, size):
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+
+            self._entries[key] = (data, size)
+            self.size += size
+
+            while self.size > self.max_size:
+                old_key, (old_data, old_size) = self._entries.popitem(last=False)
+                self.size -= old_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'size': self.size,
+            'max_size': self.max_size,
+            }
+
+fossil_cache = FossilCache(getattr(settings, 'FOSSIL_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE))
+
+def get_object_fossil(fossil):
+    """Shortcut to get a trial proxy for a fossil from the shared cache"""
+    return fossil_cache.get_object_fossil(fossil)
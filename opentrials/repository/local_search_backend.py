@@ -0,0 +1,432 @@
+"""
+In-process haystack backend, for tests and registries without Solr.
+
+It implements the subset of the query API used by the repository: exact
+filters (matching all words of the value on text fields), __in, __gt, __gte,
+__lt, __lte, __startswith and __contains filters, narrowing by field:value
+queries, field, date and query facets and sorting. Raw queries, "more like
+this" and highlighting aren't supported: the first two raise
+SearchBackendError and results are never highlighted.
+
+Documents are kept in memory. When the HAYSTACK_LOCAL_PATH setting is given
+they are also stored in a SQLite file, shared by every process using the index
+(i.e. the web server and the process_index_queue command):
+
+    HAYSTACK_SEARCH_ENGINE = 'repository.local_search_backend'
+    HAYSTACK_LOCAL_PATH = '/var/opentrials/search_index.sqlite'
+
+Every search is a linear scan: each process holds a full in-memory copy of the
+documents (the whole SQLite table, read again whenever another process changes
+it) and matches the query against every one of them, so this backend only
+suits tests and small registries.
+"""
+
+import calendar
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+
+from django.conf import settings
+
+from haystack.backends import BaseSearchBackend, BaseSearchQuery, log_query
+from haystack.constants import ID, DJANGO_CT, DJANGO_ID
+from haystack.exceptions import SearchBackendError
+from haystack.models import SearchResult
+from haystack.utils import get_identifier
+
+from repository.text_index import fold, WORD_RE
+
+FILTER_SEPARATOR = '__'
+FILTER_TYPES = ('exact', 'in', 'gt', 'gte', 'lt', 'lte', 'startswith', 'contains')
+
+NARROW_QUERY_RE = re.compile(r'^\s*(\w+):(?:"([^"]*)"|(\S+))\s*$')
+
+DATE_GAPS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+
+def as_list(value):
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+def normalize(value):
+    """Returns the form used to compare document and filter values"""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+def to_json(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, set):
+        return list(value)
+    raise TypeError('%r is not JSON serializable' % value)
+
+def query_fragment(field, filter_type, value):
+    """Readable form of a filter, as in the query log"""
+    return '%s%s%s:%r' % (field, FILTER_SEPARATOR, filter_type, value)
+
+def parse_narrow_query(query):
+    """Returns the (field, value) of a narrowing query like 'field:value' or 'field:"a value"'"""
+    match = NARROW_QUERY_RE.match(query)
+    if match is None:
+        raise SearchBackendError("The local search backend only narrows by 'field:value' queries, not %r" % query)
+    field, quoted, value = match.groups()
+    return field, quoted if value is None else value
+
+def as_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime(value.year, value.month, value.day)
+
+def add_gap(date, gap_by, gap_amount):
+    """Date after a gap of a date facet (i.e. 1 month after Jan 31st is Feb 28th)"""
+    if gap_by in ('year', 'month'):
+        months = date.month - 1 + gap_amount * (12 if gap_by == 'year' else 1)
+        year, month = date.year + months // 12, months % 12 + 1
+        return date.replace(year=year, month=month,
+                            day=min(date.day, calendar.monthrange(year, month)[1]))
+    return date + datetime.timedelta(**{gap_by + 's': gap_amount})
+
+def terms(value):
+    found = []
+    for item in as_list(value):
+        if item is not None:
+            found.extend(WORD_RE.findall(fold(str(item))))
+    return found
+
+class DocumentStore(object):
+    """Documents by id, kept in memory and optionally in a SQLite file"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.documents = {}
+        self.terms = {} # document id -> {field: Counter of terms}
+        self.lock = threading.Lock()
+        self._mtime = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('CREATE TABLE IF NOT EXISTS documents (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        return conn
+
+    def _reload(self):
+        # the file is read again only when it was changed
+        if not self.path:
+            return
+
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self._mtime:
+            return
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT id, data FROM documents').fetchall()
+
+        self.documents = dict((id, json.loads(data)) for id, data in rows)
+        self.terms = {}
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def all(self):
+        with self.lock:
+            self._reload()
+            return list(self.documents.values())
+
+    def get_terms(self, document, field):
+        fields = self.terms.setdefault(document[ID], {})
+        found = fields.get(field)
+        if found is None:
+            found = fields[field] = Counter(terms(document.get(field)))
+        return found
+
+    def save(self, documents):
+        documents = [json.loads(json.dumps(doc, default=to_json)) for doc in documents]
+
+        with self.lock:
+            self._reload()
+            for doc in documents:
+                self.documents[doc[ID]] = doc
+                self.terms.pop(doc[ID], None)
+
+            if self.path:
+                with closing(self._connect()) as conn:
+                    with conn:
+                        conn.executemany('INSERT OR REPLACE INTO documents VALUES (?, ?)',
+                                [(doc[ID], json.dumps(doc)) for doc in documents])
+                # changes from other processes may have happened meanwhile
+                self._mtime = None
+
+    def delete(self, ids):
+        with self.lock:
+            self._reload()
+            for id in ids:
+                self.documents.pop(id, None)
+                self.terms.pop(id, None)
+
+            if self.path:
+                with closing(self._connect()) as conn:
+                    with conn:
+                        conn.executemany('DELETE FROM documents WHERE id = ?', [(id,) for id in ids])
+                self._mtime = None
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path):
+    """Returns the document store of a path (or the in-memory one) for this process"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = DocumentStore(path)
+        return _stores[path]
+
+class Matcher(object):
+    """
+    Callable scoring a document against the filters of a query: zero if the
+    document doesn't match, else the number of matching terms (at least 1).
+    """
+
+    def __init__(self, query_filter, store, content_field='text'):
+        self.query_filter = query_filter
+        self.store = store
+        self.content_field = content_field
+
+    def __call__(self, document):
+        return self.score_node(document, self.query_filter)
+
+    def __str__(self):
+        return self.query_filter.as_query_string(query_fragment)
+
+    def score_node(self, document, node):
+        scores = []
+        for child in node.children:
+            if hasattr(child, 'children'):
+                scores.append(self.score_node(document, child))
+            else:
+                expression, value = child
+                field, filter_type = self.split_expression(expression)
+                scores.append(self.score_filter(document, field, filter_type, value))
+
+        if not scores:
+            score = 1
+        elif node.connector == 'OR':
+            score = sum(scores)
+        else:
+            score = sum(scores) if all(scores) else 0
+
+        if node.negated:
+            return 0 if score else 1
+        return score
+
+    def split_expression(self, expression):
+        parts = expression.split(FILTER_SEPARATOR)
+        if len(parts) > 1 and parts[-1] in FILTER_TYPES:
+            field, filter_type = FILTER_SEPARATOR.join(parts[:-1]), parts[-1]
+        else:
+            field, filter_type = expression, 'exact'
+
+        if field == 'content':
+            field = self.content_field
+
+        return field, filter_type
+
+    def is_text(self, field, values):
+        return not field.endswith('_exact') and all(isinstance(value, str) for value in values)
+
+    def score_filter(self, document, field, filter_type, value):
+        values = [item for item in as_list(document.get(field)) if item is not None]
+        if not values:
+            return 0
+
+        if filter_type == 'in':
+            return sum(self.score_filter(document, field, 'exact', item) for item in value)
+
+        if filter_type == 'exact':
+            if self.is_text(field, values):
+                found = self.store.get_terms(document, field)
+                wanted = terms(value)
+                if wanted and all(found[term] for term in wanted):
+                    return sum(found[term] for term in wanted)
+                return 0
+            return 1 if normalize(value) in [normalize(item) for item in values] else 0
+
+        if filter_type == 'startswith':
+            prefix = fold(str(value))
+            return len([term for term in self.store.get_terms(document, field) if term.startswith(prefix)])
+
+        if filter_type == 'contains':
+            needle = fold(str(value))
+            return len([item for item in values if needle in fold(str(item))])
+
+        # range filters
+        value = normalize(value)
+        compare = {
+            'gt': lambda item: item > value,
+            'gte': lambda item: item >= value,
+            'lt': lambda item: item < value,
+            'lte': lambda item: item <= value,
+            }[filter_type]
+        try:
+            return 1 if any(compare(normalize(item)) for item in values) else 0
+        except TypeError:
+            return 0
+
+class SearchBackend(BaseSearchBackend):
+    def __init__(self, site=None):
+        super(SearchBackend, self).__init__(site)
+        self.store = get_store(getattr(settings, 'HAYSTACK_LOCAL_PATH', None))
+
+    def update(self, index, iterable, commit=True):
+        self.store.save([index.full_prepare(obj) for obj in iterable])
+
+    def remove(self, obj_or_string, commit=True):
+        self.store.delete([get_identifier(obj_or_string)])
+
+    def clear(self, models=[], commit=True):
+        if models:
+            cts = set('%s.%s' % (model._meta.app_label, model._meta.object_name.lower())
+                      for model in models)
+        else:
+            cts = None
+
+        self.store.delete([doc[ID] for doc in self.store.all()
+                           if cts is None or doc.get(DJANGO_CT) in cts])
+
+    @log_query
+    def search(self, query_string, sort_by=None, start_offset=0, end_offset=None,
+               fields='', highlight=False, facets=None, date_facets=None, query_facets=None,
+               narrow_queries=None, spelling_query=None, limit_to_registered_models=None,
+               result_class=None, **kwargs):
+        # query_string is the Matcher built by SearchQuery.build_query
+        if not isinstance(query_string, Matcher):
+            raise SearchBackendError("The local search backend doesn't run raw queries")
+
+        result_class = result_class or SearchResult
+        narrow = [parse_narrow_query(query) for query in narrow_queries or ()]
+
+        matches = []
+        for document in self.store.all():
+            if not all(query_string.score_filter(document, field, 'exact', value) for field, value in narrow):
+                continue
+            score = query_string(document)
+            if score:
+                matches.append((score, document))
+
+        if sort_by:
+            for field in reversed(sort_by):
+                reverse = field.startswith('-')
+                name = field.lstrip('-')
+                if name == 'score':
+                    matches.sort(key=lambda match: match[0], reverse=reverse)
+                    continue
+                matches.sort(key=lambda match: (match[1].get(name) is not None,
+                                                normalize(match[1].get(name)) if match[1].get(name) is not None else ''),
+                             reverse=reverse)
+        else:
+            matches.sort(key=lambda match: -match[0])
+
+        facet_counts = {'fields': {}, 'dates': {}, 'queries': {}}
+        for facet in facets or ():
+            counts = Counter(value for score, document in matches
+                             for value in as_list(document.get(facet)) if value is not None)
+            facet_counts['fields'][facet] = sorted(counts.items(),
+                    key=lambda item: (-item[1], str(item[0])))
+
+        for facet, options in (date_facets or {}).items():
+            facet_counts['dates'][facet] = self.date_facet_counts(matches, facet, **options)
+
+        for facet, value in query_facets or ():
+            facet_counts['queries']['%s:%s' % (facet, value)] = len([document for score, document in matches
+                    if query_string.score_filter(document, facet, 'exact', value)])
+
+        results = []
+        for score, document in matches[start_offset:end_offset]:
+            app_label, model_name = document[DJANGO_CT].split('.')
+            stored = dict((str(key), value) for key, value in document.items()
+                          if key not in (ID, DJANGO_CT, DJANGO_ID))
+            results.append(result_class(app_label, model_name, document[DJANGO_ID], score, **stored))
+
+        return {
+            'results': results,
+            'hits': len(matches),
+            'facets': facet_counts,
+            'spelling_suggestion': None,
+            }
+
+    def date_facet_counts(self, matches, field, start_date, end_date, gap_by, gap_amount=1):
+        """Counts of a date facet, in the format of Solr (keyed by the start of each gap)"""
+        if gap_by not in DATE_GAPS:
+            raise SearchBackendError('Invalid gap for a date facet: %r' % gap_by)
+
+        # stored dates are ISO strings, dates without time at midnight
+        values = [normalize(value) for score, document in matches
+                  for value in as_list(document.get(field)) if value is not None]
+        values = [value if len(value) > 10 else value + 'T00:00:00' for value in values]
+
+        counts = {}
+        start, end = as_datetime(start_date), as_datetime(end_date)
+        while start < end:
+            gap_end = min(add_gap(start, gap_by, gap_amount), end)
+            low, high = normalize(start), normalize(gap_end)
+            counts[start.strftime('%Y-%m-%dT%H:%M:%SZ')] = len([value for value in values
+                                                               if low <= value < high])
+            start = gap_end
+
+        counts['gap'] = '+%d%s' % (gap_amount, gap_by.upper())
+        counts['end'] = end.strftime('%Y-%m-%dT%H:%M:%SZ')
+        return counts
+
+    def more_like_this(self, model_instance, additional_query_string=None, result_class=None):
+        raise SearchBackendError("The local search backend doesn't support 'more like this' queries")
+
+class SearchQuery(BaseSearchQuery):
+    def __init__(self, site=None, backend=None):
+        super(SearchQuery, self).__init__(site, backend)
+
+        if backend is not None:
+            self.backend = backend
+        else:
+            self.backend = SearchBackend(site=site)
+
+    def build_query(self):
+        content_field = 'text'
+        for index in self.backend.site.get_indexes().values():
+            content_field = index.get_content_field()
+            break
+
+        return Matcher(self.query_filter, self.backend.store, content_field)
+
+    def build_query_fragment(self, field, filter_type, value):
+        # filters are evaluated by Matcher, this only describes them
+        return query_fragment(field, filter_type, value)
+
+    def run(self, spelling_query=None):
+        kwargs = {
+            'start_offset': self.start_offset,
+            'result_class': getattr(self, 'result_class', None),
+            }
+        if self.end_offset is not None:
+            kwargs['end_offset'] = self.end_offset
+        if self.order_by:
+            kwargs['sort_by'] = self.order_by
+        if self.facets:
+            kwargs['facets'] = list(self.facets)
+        if self.date_facets:
+            kwargs['date_facets'] = self.date_facets
+        if self.query_facets:
+            kwargs['query_facets'] = self.query_facets
+        if self.narrow_queries:
+            kwargs['narrow_queries'] = self.narrow_queries
+
+        results = self.backend.search(self.build_query(), **kwargs)
+        self._results = results.get('results', [])
+        self._hit_count = results.get('hits', 0)
+        self._facet_counts = results.get('facets', {})
+        self._spelling_suggestion = results.get('spelling_suggestion', None)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from repository.models import ClinicalTrial, set_eligibility
+
+class Command(BaseCommand):
+    help = "Fills the eligibility tables (FossilEligibility) of the most recent trial fossils"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',
+                action='store',
+                dest='batch_size',
+                type=int,
+                default=500,
+                help="Number of fossils stored in each transaction",
+                )
+
+    def handle(self, batch_size=500, **options):
+        fossils = ClinicalTrial.fossils.get_query_set().filter(is_most_recent=True).order_by('pk')
+
+        count = 0
+        batch = []
+        for fossil in fossils.iterator():
+            batch.append(fossil)
+            if len(batch) == batch_size:
+                count += self.store_batch(batch)
+                batch = []
+        count += self.store_batch(batch)
+
+        self.stdout.write('%d fossils stored' % count)
+
+    @transaction.atomic
+    def store_batch(self, fossils):
+        for fossil in fossils:
+            set_eligibility(fossil)
+        return len(fossils)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from repository.xml import dump
+
+class Command(BaseCommand):
+    help = "Refreshes the pre-rendered ICTRP XML dump of all published trials"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full',
+                action='store_true',
+                dest='full',
+                default=False,
+                help="Renders again the fragments of all trials, not only the new ones",
+                )
+        parser.add_argument('--no-gzip',
+                action='store_false',
+                dest='compress',
+                default=True,
+                help="Doesn't keep a gzip-compressed copy of the dump",
+                )
+
+    def handle(self, full=False, compress=True, **options):
+        rendered, removed = dump.refresh_fragments(full=full)
+        path = dump.assemble(compress=compress)
+
+        self.stdout.write('%d fragments rendered, %d removed. Dump saved at %s' % (
+            rendered, removed, path))
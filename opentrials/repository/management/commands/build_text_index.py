@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from repository.models import ClinicalTrial, load_indexers
+from repository import text_index
+
+class Command(BaseCommand):
+    help = "Builds the local text index (repository.text_index) of the most recent trial fossils"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',
+                action='store',
+                dest='batch_size',
+                type=int,
+                default=500,
+                help="Number of fossils whose indexers are loaded at once",
+                )
+
+    def handle(self, batch_size=500, **options):
+        fossils = ClinicalTrial.fossils.get_query_set().filter(is_most_recent=True).order_by('pk')
+
+        count = 0
+        batch = []
+        for fossil in fossils.iterator():
+            batch.append(fossil)
+            if len(batch) == batch_size:
+                count += self.index_batch(batch)
+                batch = []
+        count += self.index_batch(batch)
+
+        self.stdout.write('%d fossils indexed' % count)
+
+    def index_batch(self, fossils):
+        for fossil in load_indexers(fossils):
+            text_index.index_fossil(fossil, fossil._indexers)
+        return len(fossils)
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from haystack import site
+from fossil.models import Fossil
+
+from repository.models import IndexQueueEntry
+from repository.search_indexes import commit_backend
+
+class Command(BaseCommand):
+    help = "Sends the fossils waiting in the indexing queue to the search backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size',
+                action='store',
+                dest='batch_size',
+                type=int,
+                default=100,
+                help="Number of queue entries processed at once",
+                )
+        parser.add_argument('--loop',
+                action='store_true',
+                dest='loop',
+                default=False,
+                help="Keeps waiting for new entries instead of exiting when the queue is empty",
+                )
+        parser.add_argument('--interval',
+                action='store',
+                dest='interval',
+                type=float,
+                default=2,
+                help="Seconds to wait before polling an empty queue again (with --loop)",
+                )
+
+    def handle(self, batch_size=100, loop=False, interval=2, **options):
+        index = site.get_index(Fossil)
+
+        while True:
+            processed = self.process_batch(index, batch_size)
+            if processed:
+                self.stdout.write('%d fossils indexed' % processed)
+            elif loop:
+                time.sleep(interval)
+            else:
+                break
+
+    def process_batch(self, index, batch_size):
+        # Entries are locked until the backend accepted their documents and
+        # deleted in the same transaction, so a failure leaves them queued and
+        # concurrent workers skip them
+        with transaction.atomic():
+            entries = list(IndexQueueEntry.objects.select_for_update(skip_locked=True)
+                           .order_by('pk')[:batch_size])
+            if not entries:
+                return 0
+
+            fossils = list(Fossil.objects.filter(pk__in=set(entry.fossil_id for entry in entries))
+                           .select_related('previous_revision'))
+
+            current = [fossil for fossil in fossils if fossil.is_most_recent]
+            superseded = [fossil for fossil in fossils if not fossil.is_most_recent]
+            superseded += [fossil.previous_revision for fossil in current
+                           if fossil.previous_revision and not fossil.previous_revision.is_most_recent]
+
+            if current:
+                index.backend.update(index, current, commit=False)
+            for fossil in superseded:
+                index.backend.remove(fossil, commit=False)
+            commit_backend(index.backend)
+
+            IndexQueueEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+        return len(fossils)
@@ -0,0 +1,169 @@
+import datetime
+import json
+import os
+import tempfile
+import time
+from multiprocessing import Pool, cpu_count
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from haystack import site
+from fossil.models import Fossil
+
+from repository.search_indexes import commit_backend
+
+DEFAULT_CHECKPOINT = os.path.join(tempfile.gettempdir(), 'opentrials_reindex_fossils.json')
+
+def get_queryset(only_most_recent=False, since=None):
+    if only_most_recent:
+        fossils = site.get_index(Fossil).index_queryset()
+    else:
+        fossils = Fossil.objects.all()
+
+    if since:
+        fossils = fossils.filter(creation__gte=since)
+
+    return fossils.order_by('pk')
+
+def init_worker():
+    # database connections inherited from the parent process can't be shared
+    connections.close_all()
+
+def index_range(task):
+    """Builds and posts (without committing) the documents of a pk range of fossils"""
+    first_pk, last_pk, only_most_recent, since = task
+
+    index = site.get_index(Fossil)
+    fossils = list(get_queryset(only_most_recent, since).filter(pk__gte=first_pk, pk__lte=last_pk))
+    if fossils:
+        index.backend.update(index, fossils, commit=False)
+
+    previous = [fossil.previous_revision_id for fossil in fossils if fossil.previous_revision_id]
+    if only_most_recent:
+        # revisions superseded by the fossils above may still be indexed, by
+        # an earlier run or from when they were the most recent ones
+        for fossil in Fossil.objects.filter(pk__in=previous, is_most_recent=False):
+            index.backend.remove(fossil, commit=False)
+    elif since:
+        # revisions older than the date, superseded by the fossils above, are
+        # still indexed as the most recent ones of their trials
+        superseded = list(Fossil.objects.filter(creation__lt=since, pk__in=previous))
+        if superseded:
+            index.backend.update(index, superseded, commit=False)
+
+    return len(fossils)
+
+class Command(BaseCommand):
+    help = "Rebuilds the search index of fossils in parallel, resuming interrupted runs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers',
+                action='store',
+                dest='workers',
+                type=int,
+                default=cpu_count(),
+                help="Number of processes building documents",
+                )
+        parser.add_argument('--batch-size',
+                action='store',
+                dest='batch_size',
+                type=int,
+                default=100,
+                help="Number of fossils posted to the search backend at once",
+                )
+        parser.add_argument('--commit-every',
+                action='store',
+                dest='commit_every',
+                type=int,
+                default=10,
+                help="Number of batches between commits (and checkpoints)",
+                )
+        parser.add_argument('--only-most-recent',
+                action='store_true',
+                dest='only_most_recent',
+                default=False,
+                help="Indexes only the most recent revision of each trial",
+                )
+        parser.add_argument('--since',
+                action='store',
+                dest='since',
+                default=None,
+                help="Indexes only fossils created since a date (YYYY-MM-DD or YYYY-MM-DDTHH:MM)",
+                )
+        parser.add_argument('--checkpoint',
+                action='store',
+                dest='checkpoint',
+                default=DEFAULT_CHECKPOINT,
+                help="File keeping the progress of the run",
+                )
+        parser.add_argument('--restart',
+                action='store_true',
+                dest='restart',
+                default=False,
+                help="Ignores the progress of an interrupted run",
+                )
+
+    def handle(self, workers=1, batch_size=100, commit_every=10, only_most_recent=False,
+               since=None, checkpoint=DEFAULT_CHECKPOINT, restart=False, **options):
+        since_date = self.parse_since(since) if since else None
+
+        # a checkpoint is only resumed by a run with the same options
+        run_options = {'only_most_recent': only_most_recent, 'since': since}
+
+        last_pk = None
+        if not restart and os.path.exists(checkpoint):
+            with open(checkpoint) as fp:
+                saved = json.load(fp)
+            if saved.get('options') == run_options:
+                last_pk = saved['last_pk']
+                self.stdout.write('Resuming after fossil %s' % last_pk)
+
+        fossils = get_queryset(only_most_recent, since_date)
+        if last_pk:
+            fossils = fossils.filter(pk__gt=last_pk)
+
+        pks = list(fossils.values_list('pk', flat=True))
+        tasks = [(pks[i], pks[min(i + batch_size, len(pks)) - 1], only_most_recent, since_date)
+                 for i in range(0, len(pks), batch_size)]
+        if not tasks:
+            self.stdout.write('Nothing to index')
+            return
+
+        backend = site.get_index(Fossil).backend
+
+        connections.close_all()
+        pool = Pool(workers, initializer=init_worker)
+
+        indexed = 0
+        started = time.time()
+        try:
+            for i, count in enumerate(pool.imap(index_range, tasks), 1):
+                indexed += count
+
+                if i % commit_every == 0 or i == len(tasks):
+                    commit_backend(backend)
+                    self.save_checkpoint(checkpoint, run_options, tasks[i - 1][1])
+
+                    elapsed = time.time() - started
+                    self.stdout.write('%d/%d fossils indexed (%.1f docs/sec)' % (
+                        indexed, len(pks), indexed / elapsed if elapsed else 0))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        os.remove(checkpoint)
+
+    def parse_since(self, value):
+        for format in ('%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+            try:
+                return datetime.datetime.strptime(value, format)
+            except ValueError:
+                pass
+        raise CommandError('Invalid date for --since: %s' % value)
+
+    def save_checkpoint(self, path, run_options, last_pk):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump({'options': run_options, 'last_pk': last_pk}, fp)
+        os.replace(tmp_path, path)
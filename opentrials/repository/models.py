@@ -1,4 +1,5 @@
-from django.db import models, IntegrityError
+from django.db import models, IntegrityError, transaction
+from django.db.models import prefetch_related_objects
 
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import linebreaks
@@ -10,13 +11,13 @@ from django.urls import reverse
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 
-from fossil.models import Fossil, FossilManager
+from fossil.models import Fossil, FossilManager, FossilIndexer
 from datetime import datetime
 import string
 from random import randrange, choice
 from time import sleep
 
-from utilities import safe_truncate
+from utilities import safe_truncate, age_limits, search_gender
 
 from vocabulary.models import CountryCode, StudyPhase, StudyType, RecruitmentStatus
 from vocabulary.models import InterventionCode, InstitutionType, TimePerspective
@@ -27,6 +28,11 @@ from polyglot.models import Translation
 from deleting.models import ControlledDeletion, NotDeletedManager
 
 from repository import choices
+from repository.fossil_cache import fossil_cache
+from repository import text_index
+from repository.snippets import Highlighter
+from repository.autocomplete import prefix_index
+from repository.xml import dump as ictrp_dump
 
 from trial_validation import trial_validator
 from django.db.models.signals import post_save
@@ -117,16 +123,188 @@ class ClinicalTrialManager(NotDeletedManager):
     def deserialize_for_fossil(self, data, persistent=False):
         return deserialize_trial(data, persistent)
 
-class TrialFossilsQuerySet(models.query.QuerySet):
+def load_indexers(fossils):
+    """
+    Fetches the indexers of all given fossils with a single query and attaches
+    them to each fossil as a dictionary (key -> value), so that reading indexed
+    attributes (i.e. PublishedTrial.trial_id) doesn't hit the database again.
+
+    Returns the fossils as a list.
+    """
+    fossils = list(fossils)
+    if not fossils:
+        return fossils
+
+    by_pk = {}
+    for fossil in fossils:
+        fossil._indexers = {}
+        by_pk[fossil.pk] = fossil
+
+    indexers = FossilIndexer.objects.filter(fossil__in=list(by_pk.keys()))
+    for fossil_id, key, value in indexers.values_list('fossil', 'key', 'value'):
+        by_pk[fossil_id]._indexers[key] = value
+
+    return fossils
+
+def set_indexers(fossil, values):
+    """
+    Sets the indexers of a fossil from a dictionary (key -> value), replacing
+    existing indexers with the same keys, with one delete and one bulk insert.
+    """
+    FossilIndexer.objects.filter(fossil=fossil, key__in=list(values.keys())).delete()
+    FossilIndexer.objects.bulk_create([FossilIndexer(fossil=fossil, key=key, value=value)
+                                       for key, value in values.items()])
+
+    fossil._indexers = dict(getattr(fossil, '_indexers', None) or {}, **values)
+
+class TrialProxies(object):
+    """
+    Lazy sequence of FossilClinicalTrial proxies for a queryset of fossils.
+
+    Its length is answered by a COUNT query and only the fossils of a requested
+    slice are deserialized, so it can be given straight to a Paginator. With a
+    ``highlighter`` (see repository.snippets) the proxies of a slice get the
+    snippets of their indexers.
+    """
+
+    def __init__(self, queryset, language=None, highlighter=None):
+        self.queryset = queryset
+        self.language = language
+        self.highlighter = highlighter
+        self._count = None
+
+    def get_proxy(self, obj):
+        ret = obj.get_object_fossil()
+        ret._language = self.language
+        ret.hash_code = obj.pk
+        ret.previous_revision = obj.previous_revision
+        ret.snippet = getattr(obj, 'snippet', '')
+        return ret
+
+    def count(self):
+        if self._count is None:
+            self._count = self.queryset.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            fossils = list(self.queryset[k])
+            if self.highlighter is not None and not self.highlighter.exhausted():
+                for fossil in load_indexers(fossils):
+                    fossil.snippet = self.highlighter.from_indexers(fossil._indexers)
+            return [self.get_proxy(obj) for obj in fossils]
+        return self.get_proxy(self.queryset[k])
+
+    def __iter__(self):
+        for obj in self.queryset.iterator():
+            yield self.get_proxy(obj)
+
+    def __bool__(self):
+        return self.count() > 0
+
+class TrialSearchResults(object):
+    """
+    Lazy sequence of fossils matching a haystack SearchQuerySet, in the
+    relevance order of the search backend.
+
+    Its length is the number of documents found by the backend (Solr's
+    numFound) and only the fossils of a requested slice are fetched from the
+    database, so the whole result set is never materialized.
+    """
+
+    batch_size = 100
+
+    def __init__(self, searchqueryset, queryset, facets=(), highlighter=None):
+        self.searchqueryset = searchqueryset
+        self.queryset = queryset
+        self.facets = facets
+        self.highlighter = highlighter
+
+    def _hydrate(self, results):
+        pks = [result.pk for result in results]
+        fossils = dict((fossil.pk, fossil) for fossil in self.queryset.filter(pk__in=pks))
+
+        # documents whose fossils are gone from the database are skipped
+        hydrated = [fossils[pk] for pk in pks if pk in fossils]
+
+        if self.highlighter is not None:
+            self._add_snippets(hydrated, results)
+
+        return hydrated
+
+    def _add_snippets(self, fossils, results):
+        """
+        Sets the snippet of each fossil from the highlighting of the backend
+        or, for the results it didn't highlight, from the fossil indexers.
+        """
+        highlighted = dict((result.pk, getattr(result, 'highlighted', None)) for result in results)
+
+        missing = []
+        for fossil in fossils:
+            fossil.snippet = self.highlighter.from_backend(highlighted.get(fossil.pk))
+            if not fossil.snippet:
+                missing.append(fossil)
+
+        if missing and not self.highlighter.exhausted():
+            for fossil in load_indexers(missing):
+                fossil.snippet = self.highlighter.from_indexers(fossil._indexers)
+
+    def count(self):
+        return self.searchqueryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return self._hydrate(self.searchqueryset[k])
+
+        fossils = self._hydrate([self.searchqueryset[k]])
+        if not fossils:
+            raise IndexError(k)
+        return fossils[0]
+
+    def iterator(self):
+        for start in range(0, self.count(), self.batch_size):
+            for fossil in self[start:start + self.batch_size]:
+                yield fossil
+
+    def __iter__(self):
+        return self.iterator()
+
+    def __bool__(self):
+        return self.count() > 0
+
+    def facet_counts(self):
+        """
+        Returns the number of results by value of each faceted field as a
+        dictionary (field -> list of (value, count) tuples). The counts come
+        in the same backend response as the hits, so once the length or a
+        page was requested this doesn't query the backend again.
+        """
+        fields = self.searchqueryset.facet_counts().get('fields', {})
+
+        # haystack keys the counts by the shadow field (<name>_exact)
+        return dict((name, fields.get(name + '_exact', fields.get(name, [])))
+                    for name in self.facets)
+
     def proxies(self, language=None):
-        def get_proxy(obj):
-            ret = obj.get_object_fossil()
-            ret._language = language
-            ret.hash_code = obj.pk
-            ret.previous_revision = obj.previous_revision
-            return ret
+        queryset = self.queryset.select_related('previous_revision').defer('previous_revision__serialized')
+        return TrialProxies(TrialSearchResults(self.searchqueryset, queryset, self.facets, self.highlighter),
+                            language=language)
+
+class TrialFossilsQuerySet(models.query.QuerySet):
+    def with_indexers(self):
+        """Evaluates the queryset and loads the indexers of all fossils at once"""
+        return load_indexers(self)
 
-        return [get_proxy(obj) for obj in self.all()]
+    def proxies(self, language=None, highlighter=None):
+        # the revision each proxy refers to comes in the same query
+        queryset = self.select_related('previous_revision').defer('previous_revision__serialized')
+        return TrialProxies(queryset, language=language, highlighter=highlighter)
 
 class TrialsFossilManager(FossilManager):
     _ctype = None
@@ -142,24 +320,10 @@ class TrialsFossilManager(FossilManager):
     def recruiting(self):
         return self.indexed(recruitment_status='recruiting', display='True').filter(is_most_recent=True)
 
-    def published(self, q=None):
-        if not q:
-            return self.indexed(display='True').filter(is_most_recent=True)
-        else:
-            return (self.indexed(display='True', scientific_title__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', public_title__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', acronym__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', scientific_acronym__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', scientific_acronym_expansion__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', hc_freetext__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', i_freetext__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', primary_sponsor__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', scientific_contacts__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', utrn_number__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', secondary_ids__icontains=q).filter(is_most_recent=True) |
-                    self.indexed(display='True', trial_id__icontains=q).filter(is_most_recent=True))
-
-    def published_advanced(self, q=None, is_most_recent=True, **kwargs):
+    def published(self):
+        return self.indexed(display='True').filter(is_most_recent=True)
+
+    def published_advanced(self, q=None, is_most_recent=True, facets=(), snippets=False, **kwargs):
         '''
         Provides advanced search features in PublishedTrial objects by
         using haystack as a search engine backend interface.
@@ -167,26 +331,126 @@ class TrialsFossilManager(FossilManager):
         Strings passed as the ``q`` arg, will be matched against a general
         free-text index, the ``is_most_recent`` indicates if you want recent
         or previous revisions and ``kwargs`` are optional filtering keys.
+        Counts by value of the fields listed in ``facets`` are requested along
+        with the hits (see TrialSearchResults.facet_counts). With ``snippets``
+        each fossil of the results gets the highlighted text matching ``q``
+        as its ``snippet`` attribute (see repository.snippets).
+
+        Returns a TrialSearchResults, paged straight off the search backend.
         '''
 
         hstack_qs = SearchQuerySet().filter(is_most_recent=is_most_recent)
 
+        highlighter = None
         if q:
             hstack_qs = hstack_qs.filter(text=q)
+            if snippets:
+                hstack_qs = hstack_qs.highlight()
+                highlighter = Highlighter(q)
 
         if kwargs:
             for k,v in kwargs.items():
                 filters = {k + '__in':v} if isinstance(v, list) else {k:v}
                 hstack_qs = hstack_qs.filter(**filters)
 
-        fossil_qs = self.get_query_set()
-        pks = [qs_item.pk for qs_item in hstack_qs]
+        for field in facets:
+            hstack_qs = hstack_qs.facet(field)
+
+        return TrialSearchResults(hstack_qs, self.get_query_set(), facets, highlighter)
+
+    def published_database(self, q=None, rec_status_exact=None, rec_country=None, gender=None,
+                           is_observational=None, i_type_exact=None,
+                           maximum_recruitment_age__gte=None, minimum_recruitment_age__lte=None):
+        """
+        Database counterpart of published_advanced, taking the same filtering
+        keys, run on the FossilEligibility tables. Text in ``q`` is searched
+        in the local inverted index (see repository.text_index), best matches
+        first; without it newest trials come first.
+        """
+        fossils = self.published()
+
+        if rec_status_exact:
+            if not isinstance(rec_status_exact, list):
+                rec_status_exact = [rec_status_exact]
+            fossils = fossils.filter(eligibility__recruitment_status__in=rec_status_exact)
+        if gender:
+            fossils = fossils.filter(eligibility__gender=gender)
+        if maximum_recruitment_age__gte is not None:
+            fossils = fossils.filter(eligibility__maximum_age__gte=maximum_recruitment_age__gte)
+        if minimum_recruitment_age__lte is not None:
+            fossils = fossils.filter(eligibility__minimum_age__lte=minimum_recruitment_age__lte)
+        if rec_country:
+            fossils = fossils.filter(eligibility__countries__country=rec_country)
+        if is_observational:
+            fossils = fossils.filter(eligibility__is_observational=str(is_observational).lower() == 'true')
+        if i_type_exact:
+            if not isinstance(i_type_exact, list):
+                i_type_exact = [i_type_exact]
+            fossils = fossils.filter(eligibility__institution_types__i_type__in=i_type_exact).distinct()
 
-        return fossil_qs.filter(pk__in=pks)
+        if q:
+            return text_index.search(q, fossils)
+        return fossils.order_by('-creation', '-pk')
+
+    def database_facet_counts(self, fossils):
+        """
+        Counts by the values of the facets of the search index (see
+        views.SEARCH_FACETS) of the fossils returned by published_database,
+        in the format of TrialSearchResults.facet_counts.
+        """
+        eligibility = FossilEligibility.objects.filter(fossil__in=fossils.values('pk'))
+        countries = FossilRecruitmentCountry.objects.filter(eligibility__in=eligibility.values('pk'))
+        i_types = FossilInstitutionType.objects.filter(eligibility__in=eligibility.values('pk'))
+
+        def counts(queryset, field):
+            rows = queryset.values(field).annotate(count=models.Count('pk')).order_by('-count', field)
+            return [(row[field], row['count']) for row in rows if row[field] != '']
+
+        return {
+            'rec_status': counts(eligibility, 'recruitment_status'),
+            'gender': counts(eligibility, 'gender'),
+            'is_observational': counts(eligibility, 'is_observational'),
+            'rec_country': counts(countries, 'country'),
+            'i_type': counts(i_types, 'i_type'),
+            }
 
     def archived(self):
         return self.indexed(display='True').filter(is_most_recent=False)
 
+    def with_indexers(self):
+        return self.get_query_set().with_indexers()
+
+    def resolve(self, ids):
+        """
+        Resolves a list of identifiers, each being either a fossil hash or the
+        trial id of a trial (resolved to its most recent fossil), with a fixed
+        number of queries regardless of the number of identifiers.
+
+        Returns a list of (identifier, fossil) tuples in the given order, with
+        None as fossil for identifiers that couldn't be resolved. Indexers of
+        the resolved fossils are already loaded (see load_indexers).
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+
+        by_pk = dict((fossil.pk, fossil)
+                     for fossil in self.get_query_set().filter(pk__in=ids))
+
+        missing = [id for id in ids if id not in by_pk]
+        if missing:
+            by_trial_id = self.get_query_set().filter(is_most_recent=True,
+                    indexers__key='trial_id', indexers__value__in=missing).distinct()
+        else:
+            by_trial_id = []
+
+        fossils = load_indexers(list(by_pk.values()) + list(by_trial_id))
+
+        most_recent = dict((fossil._indexers.get('trial_id'), fossil)
+                           for fossil in fossils if fossil.is_most_recent)
+
+        return [(id, by_pk.get(id) or most_recent.get(id)) for id in ids]
+
     def proxies(self, language=None):
         return self.get_query_set().proxies(language=language)
 
@@ -199,32 +463,156 @@ class PublishedTrial(Fossil):
 
     objects = _default_manager = TrialsFossilManager()
 
+    def _indexer_value(self, name):
+        # Indexers loaded in bulk by load_indexers() are used when available
+        indexers = self.__dict__.get('_indexers', None)
+        if indexers is not None:
+            return indexers.get(name, '')
+
+        try:
+            return self.indexers.key(name).value
+        except ObjectDoesNotExist:
+            return ''
+
     def __getattr__(self, name):
         if name in ('display','status','scientific_title','public_title',
                     'acronym','scientific_acronym','scientific_acronym_expansion',
                     'hc_freetext','i_freetext','primary_sponsor','scientific_contacts',
-                    'utrn_number','secondary_ids'):
-            try:
-                return self.indexers.key(name).value
-            except ObjectDoesNotExist:
-                return ''
+                    'utrn_number','secondary_ids','recruitment_status'):
+            return self._indexer_value(name)
         else:
             raise AttributeError(name)
 
     @property
     def trial_id(self):
-        try:
-            return self.indexers.key('trial_id').value
-        except ObjectDoesNotExist:
-            return ''
+        return self._indexer_value('trial_id')
 
     def get_object_fossil(self, force_load=False):
-        if force_load or not getattr(self, '_object_fossil', None):
+        if force_load:
             self._object_fossil = super(PublishedTrial, self).get_object_fossil()
+        elif not getattr(self, '_object_fossil', None):
+            self._object_fossil = fossil_cache.get_object_fossil(self)
 
         return self._object_fossil
     trial = property(get_object_fossil)
 
+class FossilPosting(models.Model):
+    """Occurrence of a term in a text indexer of a fossil (see repository.text_index)"""
+    fossil = models.ForeignKey(Fossil, related_name='postings')
+    field = models.CharField(max_length=32)
+    term = models.CharField(max_length=64, db_index=True)
+    position = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.term} ({self.field}:{self.position})"
+
+class IndexQueueEntry(models.Model):
+    """
+    Fossil waiting to be sent to the search backend. Entries are written with
+    the fossil and drained by the process_index_queue command.
+    """
+    fossil = models.ForeignKey(Fossil, related_name='index_queue_entries')
+    created = models.DateTimeField(default=datetime.now, editable=False)
+
+    def __str__(self):
+        return f"{self.fossil_id} ({self.created})"
+
+class FossilEligibility(models.Model):
+    """
+    Eligibility criteria and study type of a fossil, normalized as in the
+    search index so searches without text run as indexed scans in the
+    database (see TrialsFossilManager.published_database).
+    """
+    fossil = models.OneToOneField(Fossil, primary_key=True, related_name='eligibility')
+    recruitment_status = models.CharField(max_length=255, blank=True)
+    gender = models.CharField(max_length=8) # male, female or both
+    minimum_age = models.PositiveIntegerField() # in hours
+    maximum_age = models.PositiveIntegerField() # in hours
+    is_observational = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['recruitment_status', 'gender', 'minimum_age', 'maximum_age'],
+                                name='repository_eligibility_idx')]
+
+    def __str__(self):
+        return f"{self.fossil_id}: {self.recruitment_status} {self.gender} {self.minimum_age}-{self.maximum_age}h"
+
+class FossilRecruitmentCountry(models.Model):
+    eligibility = models.ForeignKey(FossilEligibility, related_name='countries')
+    country = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = (('country', 'eligibility'),)
+
+    def __str__(self):
+        return self.country
+
+class FossilInstitutionType(models.Model):
+    """Type of the institution of a support source of a fossil"""
+    eligibility = models.ForeignKey(FossilEligibility, related_name='institution_types')
+    i_type = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = (('i_type', 'eligibility'),)
+
+    def __str__(self):
+        return self.i_type
+
+def set_eligibility(fossil, data=None):
+    """Stores the eligibility criteria of a fossil from its serialized data"""
+    if data is None:
+        data = fossil_cache.get_data(fossil)
+
+    minimum_age, maximum_age = age_limits(data.get('agemin_value'), data.get('agemin_unit', '-'),
+                                          data.get('agemax_value'), data.get('agemax_unit', '-'))
+
+    FossilEligibility.objects.filter(fossil=fossil).delete()
+    eligibility = FossilEligibility.objects.create(fossil=fossil,
+            recruitment_status=(data.get('recruitment_status') or {}).get('label', ''),
+            gender=search_gender(data.get('gender')),
+            minimum_age=minimum_age,
+            maximum_age=maximum_age,
+            is_observational=bool(data.get('is_observational')))
+
+    countries = set(country['label'] for country in data.get('recruitment_country') or [])
+    FossilRecruitmentCountry.objects.bulk_create([
+        FossilRecruitmentCountry(eligibility=eligibility, country=country) for country in countries])
+
+    # as in FossilIndex.prepare_i_type
+    i_types = set()
+    for source in data.get('support_sources') or []:
+        try:
+            i_types.add(source['institution']['i_type']['label'])
+        except (KeyError, TypeError):
+            pass
+    FossilInstitutionType.objects.bulk_create([
+        FossilInstitutionType(eligibility=eligibility, i_type=i_type) for i_type in i_types])
+
+    return eligibility
+
+def _prefixed(prefix, lookups):
+    return [prefix + '__' + lookup for lookup in lookups]
+
+INSTITUTION_LOOKUPS = ['country__translations', 'i_type__translations', 'creator']
+CONTACT_LOOKUPS = ['country__translations', 'creator'] + _prefixed('affiliation', INSTITUTION_LOOKUPS)
+
+# Relations loaded at once to serialize a trial for its fossil (see
+# ClinicalTrial.serialize_for_fossil), including translations of outcomes,
+# descriptors and vocabulary terms
+FOSSIL_PREFETCH_LOOKUPS = (
+    _prefixed('primary_sponsor', INSTITUTION_LOOKUPS) +
+    [name + '__translations' for name in ('study_type', 'purpose', 'intervention_assignment',
+        'masking', 'allocation', 'phase', 'recruitment_status', 'time_perspective',
+        'observational_study_design', 'i_code', 'recruitment_country')] +
+    _prefixed('public_contact', CONTACT_LOOKUPS) +
+    _prefixed('scientific_contact', CONTACT_LOOKUPS) +
+    _prefixed('site_contact', CONTACT_LOOKUPS) +
+    _prefixed('trialsecondarysponsor_set__institution', INSTITUTION_LOOKUPS) +
+    _prefixed('trialsupportsource_set__institution', INSTITUTION_LOOKUPS) +
+    ['translations', 'trialnumber_set', 'descriptor_set__translations',
+     'outcome_set__translations']
+    )
+
 class ClinicalTrial(TrialRegistrationDataSetModel):
     objects = ClinicalTrialManager()
     published = TrialsPublished()
@@ -528,34 +916,63 @@ class ClinicalTrial(TrialRegistrationDataSetModel):
     def trial_attach(self):
         return self.submission.attachment_set.all().select_related()
 
+    def prefetch_for_fossil(self):
+        """Loads the whole graph of related objects needed to serialize this trial"""
+        prefetch_related_objects([self], *FOSSIL_PREFETCH_LOOKUPS)
+
     def serialize_for_fossil(self, as_string=True):
+        self.prefetch_for_fossil()
         return serialize_trial(self, as_string, attrs_to_ignore=['status','_deleted'])
 
     @property
     def public_url(self):
         return reverse('repository.trial_registered', kwargs={'trial_fossil_id': self.trial_id})
 
+    @transaction.atomic
     def create_fossil(self):
+        # drops related objects prefetched for an earlier fossil of this instance
+        self._prefetched_objects_cache = {}
+
         fossil = PublishedTrial.objects.create_for_object(self)
-        fossil.set_indexer(key='trial_id', value=self.trial_id)
-        fossil.set_indexer(key='status', value=self.status)
-        fossil.set_indexer(key='display', value='True')
-
-        fossil.set_indexer(key='scientific_title', value=length_truncate("%s%s" % (self.scientific_title, '|'.join([trans.scientific_title for trans in self.translations.all()]))))
-        fossil.set_indexer(key='public_title', value=length_truncate("%s%s" % (self.public_title, '|'.join([trans.public_title for trans in self.translations.all()]))))
-        fossil.set_indexer(key='acronym', value="%s%s" % (self.acronym, '|'.join([trans.acronym for trans in self.translations.all()])))
-        fossil.set_indexer(key='scientific_acronym', value="%s%s" % (self.scientific_acronym, '|'.join([trans.scientific_acronym for trans in self.translations.all()])))
-        fossil.set_indexer(key='scientific_acronym_expansion', value="%s%s" % (self.scientific_acronym_expansion, '|'.join([trans.scientific_acronym_expansion for trans in self.translations.all()])))
-        fossil.set_indexer(key='hc_freetext', value=length_truncate("%s%s" % (self.hc_freetext, '|'.join([trans.hc_freetext for trans in self.translations.all()]))))
-        fossil.set_indexer(key='i_freetext', value=length_truncate("%s%s" % (self.i_freetext, '|'.join([trans.i_freetext for trans in self.translations.all()]))))
-        fossil.set_indexer(key='primary_sponsor', value=self.primary_sponsor.name)
-        fossil.set_indexer(key='scientific_contacts', value="%s" % ('|'.join(["%s|%s" % (contact.name(),contact.email) for contact in self.scientific_contacts()])))
-        fossil.set_indexer(key='utrn_number', value=self.utrn_number)
-        fossil.set_indexer(key='secondary_ids', value="%s" % ('|'.join([t_number.id_number for t_number in self.trial_number()])))
 
+        # indexer values are taken from the same prefetched snapshot used to
+        # serialize the trial
+        self.prefetch_for_fossil()
+        translations = list(self.translations.all())
+
+        def with_translations(name):
+            return "%s%s" % (getattr(self, name), '|'.join([getattr(trans, name) for trans in translations]))
+
+        indexers = {
+            'trial_id': self.trial_id,
+            'status': self.status,
+            'display': 'True',
+            'scientific_title': length_truncate(with_translations('scientific_title')),
+            'public_title': length_truncate(with_translations('public_title')),
+            'acronym': with_translations('acronym'),
+            'scientific_acronym': with_translations('scientific_acronym'),
+            'scientific_acronym_expansion': with_translations('scientific_acronym_expansion'),
+            'hc_freetext': length_truncate(with_translations('hc_freetext')),
+            'i_freetext': length_truncate(with_translations('i_freetext')),
+            'primary_sponsor': self.primary_sponsor.name,
+            'scientific_contacts': '|'.join(["%s|%s" % (contact.name(),contact.email)
+                                             for contact in self.scientific_contact.all()]),
+            'utrn_number': self.utrn_number,
+            'secondary_ids': '|'.join([t_number.id_number for t_number in self.trialnumber_set.all()]),
+            }
 
         if self.recruitment_status:
-            fossil.set_indexer(key='recruitment_status', value=self.recruitment_status.label)
+            indexers['recruitment_status'] = self.recruitment_status.label
+
+        set_indexers(fossil, indexers)
+        text_index.index_fossil(fossil, indexers)
+        if fossil.previous_revision_id:
+            # superseded revisions are never searched as text
+            FossilPosting.objects.filter(fossil=fossil.previous_revision_id).delete()
+        set_eligibility(fossil)
+        IndexQueueEntry.objects.create(fossil=fossil)
+        transaction.on_commit(lambda: prefix_index.add(indexers))
+        transaction.on_commit(lambda: ictrp_dump.trial_published(self.trial_id, fossil))
 
         return fossil
 
@@ -0,0 +1,44 @@
+"""
+Cache of rendered pages of published trials.
+
+Each fossil is an immutable revision, so the page of a trial only needs to be
+rendered again when a new revision is published (which changes the fossil
+hash used in the cache key) or when its attachments change. The latter is
+tracked by the time of the last change of its public attachments, stored
+with the submission of the trial (see the Attachment signals), so all
+processes agree on it and it is also used for the Last-Modified header.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+
+TRIAL_PAGE_KEY = 'repository:trial_registered:%s|%s|%s|%s'
+
+TRIAL_PAGE_CACHE_TIMEOUT = getattr(settings, 'TRIAL_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+def timestamp(value):
+    """Seconds since the epoch of a datetime, naive ones being in the current time zone"""
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.timestamp()
+
+def attachments_version(trial_id):
+    """
+    Returns the current version of the attachment set of a given trial (the
+    time of its last change, in milliseconds, or 0 if it never changed).
+    """
+    from reviewapp.models import Submission
+
+    updated = Submission.objects.filter(trial__trial_id=trial_id).values_list(
+            'attachments_updated', flat=True).first()
+    return int(timestamp(updated) * 1000) if updated else 0
+
+def attachments_modified(attachs_version):
+    """Time of the last change of an attachment set, in seconds since the epoch"""
+    return attachs_version // 1000
+
+def trial_page_key(fossil_pk, language, host, attachs_version):
+    return TRIAL_PAGE_KEY % (fossil_pk, language, host, attachs_version)
+
+def trial_page_etag(fossil_pk, language, attachs_version):
+    return '"%s-%s-%s"' % (fossil_pk, language, attachs_version)
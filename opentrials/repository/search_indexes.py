@@ -1,10 +1,29 @@
+import threading
+
 from haystack.indexes import SearchIndex, CharField, DateTimeField, BooleanField, MultiValueField, IntegerField
 from haystack import site
 from fossil.models import Fossil
-from utilities import normalize_age
+from utilities import age_limits, search_gender
+
+from repository.fossil_cache import get_object_fossil
+
+# fields with a value for each translation of a trial
+MULTILINGUAL_FIELDS = ['scientific_title', 'public_title', 'acronym',
+    'scientific_acronym', 'scientific_acronym_expansion', 'hc_freetext', 'i_freetext']
+
+def commit_backend(backend):
+    """
+    Commits the changes sent to a search backend with commit=False. Only Solr
+    defers them, other backends (i.e. repository.local_search_backend) apply
+    each change as it is sent.
+    """
+    conn = getattr(backend, 'conn', None)
+    if conn is not None:
+        conn.commit()
 
 class FossilIndex(SearchIndex):
-    text = CharField(document=True, use_template=False, stored=False)
+    # stored, so that Solr can highlight it (see repository.snippets)
+    text = CharField(document=True, use_template=False, stored=True)
     trial_id = CharField()
     rev_seq = CharField()
     is_most_recent = BooleanField()
@@ -13,40 +32,89 @@ class FossilIndex(SearchIndex):
     date_registration = DateTimeField()
     outdated = BooleanField()
     status = CharField()
-    rec_country = MultiValueField()
-    is_observational = BooleanField()
+    rec_country = MultiValueField(faceted=True)
+    is_observational = BooleanField(faceted=True)
     i_type = MultiValueField(faceted=True)
-    gender = CharField()
+    gender = CharField(faceted=True)
     minimum_recruitment_age = IntegerField() #in hours
     maximum_recruitment_age = IntegerField() #in hours
 
+    _local = threading.local()
+
+    def index_queryset(self):
+        """Only the most recent revision of each trial is indexed"""
+        return self.model._default_manager.filter(is_most_recent=True)
+
+    def full_prepare(self, obj):
+        # the fossil is decoded once and every prepare_* method reads this
+        # snapshot of it
+        self._local.snapshot = (obj.pk, get_object_fossil(obj))
+        try:
+            return super(FossilIndex, self).full_prepare(obj)
+        finally:
+            self._local.snapshot = None
+
+    def get_fossil_ct(self, obj):
+        snapshot = getattr(self._local, 'snapshot', None)
+        if snapshot and snapshot[0] == obj.pk:
+            return snapshot[1]
+        return get_object_fossil(obj)
+
+    def translated_values(self, fossil_ct):
+        """
+        Returns a list with the main title and the values of multilingual
+        fields for each translation of a trial, computed once per snapshot.
+        """
+        values = fossil_ct.__dict__.get('_translated_values')
+        if values is not None:
+            return values
+
+        fossil_ct._load_translations()
+        language = fossil_ct._language
+
+        values = []
+        for lang in fossil_ct._translations.keys():
+            fossil_ct._language = lang
+            item = {}
+            try:
+                item['main_title'] = fossil_ct.main_title()
+            except AttributeError:
+                pass
+            for name in MULTILINGUAL_FIELDS:
+                try:
+                    item[name] = getattr(fossil_ct, name)
+                except AttributeError:
+                    pass
+            values.append(item)
+
+        fossil_ct._language = language
+        fossil_ct._translated_values = values
+
+        return values
+
 
     def prepare_minimum_recruitment_age(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         try:
             unit = fossil_ct.agemin_unit
             value = fossil_ct.agemin_value
         except:
             return None
 
-        age = normalize_age(value, unit) if unit != '-' else 0
-
-        return age
+        return age_limits(value, unit, None, '-')[0]
 
     def prepare_maximum_recruitment_age(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         try:
             unit = fossil_ct.agemax_unit
             value = fossil_ct.agemax_value
         except:
             return None
 
-        age = normalize_age(value, unit) if unit != '-' else normalize_age(200, 'Y')
-
-        return age
+        return age_limits(None, '-', value, unit)[1]
 
     def prepare_trial_id(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         try:
             return fossil_ct.trial_id
         except AttributeError:
@@ -60,50 +128,42 @@ class FossilIndex(SearchIndex):
 
     def prepare_rec_status(self, obj):
         try:
-            return obj.get_object_fossil().recruitment_status.label
+            return self.get_fossil_ct(obj).recruitment_status.label
         except AttributeError:
             return None
 
     def prepare_date_registration(self, obj):
         try:
-            return obj.get_object_fossil().date_registration
+            return self.get_fossil_ct(obj).date_registration
         except AttributeError:
             return None
 
     def prepare_outdated(self, obj):
         try:
-            return obj.get_object_fossil().outdated
+            return self.get_fossil_ct(obj).outdated
         except AttributeError:
             return None
 
     def prepare_status(self, obj):
         try:
-            return obj.get_object_fossil().status
+            return self.get_fossil_ct(obj).status
         except AttributeError:
             return None
 
     def prepare_main_title(self, obj):
-        fossil_ct = obj.get_object_fossil()
-        fossil_ct._load_translations()
-
-        try:
-            main_titles = []
-            for lang in fossil_ct._translations.keys():
-                fossil_ct._language = lang
-                main_titles.append(fossil_ct.main_title())
+        fossil_ct = self.get_fossil_ct(obj)
+        translated = self.translated_values(fossil_ct)
 
-            return main_titles
-        except AttributeError:
+        if any('main_title' not in item for item in translated):
             return None
 
+        return [item['main_title'] for item in translated]
+
     def prepare_text(self, obj):
-        fossil_ct = obj.get_object_fossil()
-        fossil_ct._load_translations()
+        fossil_ct = self.get_fossil_ct(obj)
 
         retrieve_data_from = ['scientific_contacts', 'utrn_number', 'secondary_ids', 'trial_id', 'scientific_title',
           'public_title', 'acronym', 'scientific_acronym', 'scientific_acronym_expansion', 'hc_freetext', 'i_freetext']
-        retrieve_data_from_multilanguage = ['scientific_title', 'public_title', 'acronym',
-          'scientific_acronym', 'scientific_acronym_expansion', 'hc_freetext', 'i_freetext']
 
         all_text = set()
         for fossil_method in retrieve_data_from:
@@ -112,13 +172,10 @@ class FossilIndex(SearchIndex):
             except AttributeError:
                 pass
 
-        for lang in fossil_ct._translations.keys(): #index content in all available languages
-            fossil_ct._language = lang
-            for fossil_method in retrieve_data_from_multilanguage:
-                try:
-                    all_text.add(getattr(fossil_ct, fossil_method))
-                except AttributeError:
-                    pass
+        for item in self.translated_values(fossil_ct): #index content in all available languages
+            for fossil_method in MULTILINGUAL_FIELDS:
+                if fossil_method in item:
+                    all_text.add(item[fossil_method])
 
         primary_sponsor = getattr(fossil_ct, 'primary_sponsor', '')
         if primary_sponsor:
@@ -130,15 +187,15 @@ class FossilIndex(SearchIndex):
         return ' '.join(all_text).strip()
 
     def prepare_rec_country(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         return [country['label'] for country in fossil_ct.recruitment_country]
 
     def prepare_is_observational(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         return getattr(fossil_ct, 'is_observational', False)
 
     def prepare_i_type(self, obj):
-        fossil_ct = obj.get_object_fossil()
+        fossil_ct = self.get_fossil_ct(obj)
         sources = []
         for source in fossil_ct.support_sources:
             try:
@@ -150,12 +207,7 @@ class FossilIndex(SearchIndex):
         return sources
 
     def prepare_gender(self, obj):
-        fossil_ct = obj.get_object_fossil()
-        if fossil_ct.gender == 'M':
-            return 'male'
-        elif fossil_ct.gender == 'F':
-            return 'female'
-        else:
-            return 'both'
+        fossil_ct = self.get_fossil_ct(obj)
+        return search_gender(fossil_ct.gender)
 
 site.register(Fossil, FossilIndex)
@@ -10,6 +10,16 @@ from fossil.fields import FossilProxy, DictKeyAttribute
 from polyglot.models import lang_format
 from utilities import safe_truncate
 
+def prefetched_objects(obj, name):
+    """
+    Returns the list of related objects of a given name that were loaded by
+    prefetch_related, or None if they weren't prefetched.
+    """
+    cache = getattr(obj, '_prefetched_objects_cache', None) or {}
+    if name in cache:
+        return list(cache[name])
+    return None
+
 def serialize_trial(trial, as_string=True, attrs_to_ignore=None):
     """
     Serialize a given ClinicalTrial and its dependencies in once trunk.
@@ -60,23 +70,40 @@ def serialize_trial(trial, as_string=True, attrs_to_ignore=None):
         except AttributeError:
             continue
 
-        json[field.name] = [item.serialize_for_fossil(as_string=False) for item in objects.all()]
+        json[field.name] = [item.serialize_for_fossil(as_string=False) for item in objects]
 
     # Other attributes
+    descriptors = prefetched_objects(trial, 'descriptor_set')
+    outcomes = prefetched_objects(trial, 'outcome_set')
+
+    def related(method, prefetched=None, **filters):
+        # Filters prefetched objects in memory instead of calling the method
+        # (which would run a new query)
+        if prefetched is None:
+            return getattr(trial, method)()
+        return [item for item in prefetched
+                if all(getattr(item, k) == v for k, v in filters.items())]
+
     if hasattr(trial, 'secondary_sponsors'):
         json['secondary_sponsors'] = [item.serialize_for_fossil(as_string=False) for item in trial.secondary_sponsors()]
     if hasattr(trial, 'hc_code'):
-        json['hc_code'] = [item.serialize_for_fossil(as_string=False) for item in trial.hc_code()]
+        json['hc_code'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('hc_code', descriptors, aspect='HealthCondition', level='general')]
     if hasattr(trial, 'hc_keyword'):
-        json['hc_keyword'] = [item.serialize_for_fossil(as_string=False) for item in trial.hc_keyword()]
+        json['hc_keyword'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('hc_keyword', descriptors, aspect='HealthCondition', level='specific')]
     if hasattr(trial, 'intervention_keyword'):
-        json['intervention_keyword'] = [item.serialize_for_fossil(as_string=False) for item in trial.intervention_keyword()]
+        json['intervention_keyword'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('intervention_keyword', descriptors, aspect='Intervention')]
     if hasattr(trial, 'primary_outcomes'):
-        json['primary_outcomes'] = [item.serialize_for_fossil(as_string=False) for item in trial.primary_outcomes()]
+        json['primary_outcomes'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('primary_outcomes', outcomes, interest='primary')]
     if hasattr(trial, 'secondary_outcomes'):
-        json['secondary_outcomes'] = [item.serialize_for_fossil(as_string=False) for item in trial.secondary_outcomes()]
+        json['secondary_outcomes'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('secondary_outcomes', outcomes, interest='secondary')]
     if hasattr(trial, 'trial_number'):
-        json['trial_number'] = [item.serialize_for_fossil(as_string=False) for item in trial.trial_number()]
+        json['trial_number'] = [item.serialize_for_fossil(as_string=False)
+                for item in related('trial_number', prefetched_objects(trial, 'trialnumber_set'))]
     if hasattr(trial, 'support_sources'):
         json['support_sources'] = [item.serialize_for_fossil(as_string=False) for item in trial.support_sources()]
     if hasattr(trial, 'acronym_display'):
@@ -505,18 +532,34 @@ class FossilClinicalTrial(FossilProxy):
     _language = None
     _translations = None
 
+    # resolved attribute values by language, so each attribute is translated
+    # once and later accesses (i.e. from templates) are a dict lookup
+    _resolved = None
+
     def _load_translations(self):
         if self._translations is None:
             self._translations = dict([(lang_format(t.get('language', '').lower()), t)
                 for t in self.object_fossil.translations])
 
+    def _memoized(self, name, resolve):
+        if self._resolved is None:
+            self._resolved = {}
+
+        values = self._resolved.get(self._language)
+        if values is None:
+            values = self._resolved[self._language] = {}
+
+        try:
+            return values[name]
+        except KeyError:
+            value = values[name] = resolve(name)
+            return value
+
     def __getattr__(self, name):
-        value = super(FossilClinicalTrial, self).__getattr__(name)
+        return self._memoized(name, self._resolve)
 
-        def filter_by_language(item):
-            lang1 = (item.get('language', None) or '').lower()
-            lang2 = (self._language or '').lower()
-            return lang1 == lang2
+    def _resolve(self, name):
+        value = super(FossilClinicalTrial, self).__getattr__(name)
 
         if name in ('date_registration','created','updated','exported'):
             if isinstance(value, basestring):
@@ -526,11 +569,7 @@ class FossilClinicalTrial(FossilProxy):
                     value = datetime.datetime.strptime(value, '%Y-%m-%d')
 
         elif isinstance(value, dict) and value.get('translations', None):
-            try:
-                value = filter(filter_by_language, value['translations'])[0]
-                #value = [t for t in value['translations'] if t.get('language', '').lower() == self._language.lower()][0]
-            except IndexError:
-                pass
+            value = self._translated_item(value)
 
         elif self._language:
             self._load_translations()
@@ -544,6 +583,29 @@ class FossilClinicalTrial(FossilProxy):
 
         return value
 
+    def _translated_item(self, item):
+        """The translation of a vocabulary item to the current language, or the item"""
+        language = (self._language or '').lower()
+        for trans in item.get('translations', None) or ():
+            if (trans.get('language', None) or '').lower() == language:
+                return trans
+        return item
+
+    def _translated_list(self, name):
+        # memoized values are shared by all callers, so lists are immutable
+        items = super(FossilClinicalTrial, self).__getattr__(name)
+        return tuple(self._translated_item(item) for item in items)
+
+    def _contacts(self, name):
+        try:
+            contacts = super(FossilClinicalTrial, self).__getattr__(name)
+        except AttributeError:
+            if name != 'site_contact':
+                raise
+            contacts = []
+
+        return tuple(FossilContact(contact, language=self._language) for contact in contacts)
+
     def main_title(self):
         if self.public_title:
             return self.public_title
@@ -562,12 +624,11 @@ class FossilClinicalTrial(FossilProxy):
         # would be unnecessary
         if value:
             from vocabulary.models import RecruitmentStatus
-            try:
-                rec_status = RecruitmentStatus.objects.get(label=value['label'])
-                trans = rec_status.translations.get(language=lang_format(self._language))
-                return trans.label
-            except ObjectDoesNotExist:
+            from vocabulary.snapshot import get_snapshot
+            rec_status = get_snapshot().get_by_label(RecruitmentStatus, value['label'])
+            if rec_status is None:
                 return value['label']
+            return rec_status.translated(self._language, 'label')
 
         return value
 
@@ -576,59 +637,30 @@ class FossilClinicalTrial(FossilProxy):
 
     @property
     def recruitment_country(self):
-        countries = super(FossilClinicalTrial, self).__getattr__('recruitment_country')
-
-        def get_trans(item):
-            try:
-                return [t for t in item['translations'] if t.get('language', '').lower() == self._language.lower()][0]
-            except IndexError:
-                return item
-
-        return map(get_trans, countries)
+        return self._memoized('recruitment_country', self._translated_list)
 
     @property
     def i_code(self):
-        codes = super(FossilClinicalTrial, self).__getattr__('i_code')
-
-        def get_trans(item):
-            try:
-                return [t for t in item['translations'] if t.get('language', '').lower() == self._language.lower()][0]
-            except IndexError:
-                return item
-
-        return map(get_trans, codes)
+        return self._memoized('i_code', self._translated_list)
 
     @property
     def public_contact(self):
-        contacts = super(FossilClinicalTrial, self).__getattr__('public_contact')
-
-        contacts = [FossilContact(contact, language=self._language) for contact in contacts]
-
-        return contacts
+        return self._memoized('public_contact', self._contacts)
 
     @property
     def scientific_contact(self):
-        contacts = super(FossilClinicalTrial, self).__getattr__('scientific_contact')
-
-        contacts = [FossilContact(contact, language=self._language) for contact in contacts]
-
-        return contacts
+        return self._memoized('scientific_contact', self._contacts)
 
     @property
     def site_contact(self):
-        try:
-            contacts = super(FossilClinicalTrial, self).__getattr__('site_contact')
-            contacts = [FossilContact(contact, language=self._language) for contact in contacts]
-        except AttributeError:
-            contacts = []
-
-        return contacts
+        return self._memoized('site_contact', self._contacts)
 
 class FossilContact(FossilProxy):
     _language = None
 
     def __init__(self, contact, language):
-        contact['__model__'] = 'Contact'
+        # the contact dictionary may be shared by the fossil cache
+        contact = dict(contact, __model__='Contact')
 
         super(FossilContact, self).__init__(contact)
 
@@ -0,0 +1,153 @@
+"""
+Highlighted snippets of the text of trials matching a search.
+
+Snippets come from the search backend when it highlights the documents (Solr)
+and otherwise from an offset based highlighter run on the indexer values of
+the fossils, which are loaded with a single query for a whole page of results.
+
+A Highlighter is created for each request: once its time budget is spent the
+remaining results get no snippet, so long fields can't slow down a page.
+"""
+
+import re
+import time
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from repository.text_index import fold, parse_query, term_matches, WORD_RE, MAX_TERM_LENGTH
+
+# indexers searched for a snippet, in order of preference
+SNIPPET_FIELDS = ('hc_freetext', 'i_freetext', 'scientific_title', 'public_title')
+
+MAX_LENGTH = 200 # characters of text in a snippet
+TIME_BUDGET = 0.05 # seconds spent highlighting the results of a request
+
+ELLIPSIS = u'…'
+
+# tags around the terms highlighted by Solr
+BACKEND_HIGHLIGHT_RE = re.compile(r'<em>(.*?)</em>', re.DOTALL)
+
+def fold_with_offsets(text):
+    """
+    Returns the folded text (see text_index.fold) and the offset in ``text``
+    of each of its characters.
+    """
+    folded = []
+    offsets = []
+    for i, char in enumerate(text):
+        for folded_char in fold(char):
+            folded.append(folded_char)
+            offsets.append(i)
+    return ''.join(folded), offsets
+
+def match_spans(text, clauses):
+    """
+    Returns the (start, end) offsets in ``text`` of the occurrences of the
+    clauses of a query (see text_index.parse_query).
+    """
+    folded, offsets = fold_with_offsets(text)
+    tokens = [(offsets[match.start()], offsets[match.end() - 1] + 1, match.group()[:MAX_TERM_LENGTH])
+              for match in WORD_RE.finditer(folded)]
+
+    spans = []
+    for terms in clauses:
+        for i in range(len(tokens) - len(terms) + 1):
+            if all(term_matches(term, tokens[i + j][2]) for j, term in enumerate(terms)):
+                spans.append((tokens[i][0], tokens[i + len(terms) - 1][1]))
+
+    return merge_spans(spans)
+
+def merge_spans(spans):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+def render(text, spans, max_length=MAX_LENGTH):
+    """
+    Returns the HTML of a window of at most ``max_length`` characters of
+    ``text`` around its first span, with the spans inside it highlighted.
+    """
+    first_start, first_end = spans[0]
+
+    start = 0
+    if len(text) > max_length:
+        start = max(0, first_start - (max_length - (first_end - first_start)) // 2)
+        start = min(start, max(0, len(text) - max_length))
+        # starts at a word boundary
+        if start and text[start - 1].isalnum():
+            boundary = text.find(' ', start, first_start)
+            if boundary != -1:
+                start = boundary + 1
+    end = min(len(text), start + max_length)
+
+    html = []
+    position = start
+    for span_start, span_end in spans:
+        span_start, span_end = max(span_start, start), min(span_end, end)
+        if span_start >= span_end:
+            continue
+        html.append(escape(text[position:span_start]))
+        html.append(u'<em>%s</em>' % escape(text[span_start:span_end]))
+        position = span_end
+    html.append(escape(text[position:end]))
+
+    return mark_safe(u'%s%s%s' % (ELLIPSIS if start else u'',
+                                  u''.join(html).strip(),
+                                  ELLIPSIS if end < len(text) else u''))
+
+def parse_backend_fragment(fragment):
+    """Returns the plain text and the highlighted spans of a Solr fragment"""
+    text = []
+    spans = []
+    length = 0
+    position = 0
+    for match in BACKEND_HIGHLIGHT_RE.finditer(fragment):
+        text.append(fragment[position:match.start()])
+        length += match.start() - position
+        spans.append((length, length + len(match.group(1))))
+        text.append(match.group(1))
+        length += len(match.group(1))
+        position = match.end()
+    text.append(fragment[position:])
+    return ''.join(text), spans
+
+class Highlighter(object):
+    """Builds the snippets of the results of a query within a time budget"""
+
+    def __init__(self, q, fields=SNIPPET_FIELDS, max_length=MAX_LENGTH, time_budget=TIME_BUDGET):
+        self.clauses = parse_query(q or '')
+        self.fields = fields
+        self.max_length = max_length
+        self.deadline = time.time() + time_budget
+
+    def exhausted(self):
+        return not self.clauses or time.time() > self.deadline
+
+    def from_backend(self, highlighted):
+        """
+        Snippet from the highlighting of a search result (a dictionary of
+        field -> list of fragments), or '' if there is none.
+        """
+        for fragments in (highlighted or {}).values():
+            for fragment in fragments:
+                text, spans = parse_backend_fragment(fragment)
+                if spans:
+                    return render(text, spans, self.max_length)
+        return ''
+
+    def from_indexers(self, indexers):
+        """Snippet from the indexer values of a fossil, or '' if there is none"""
+        for field in self.fields:
+            if self.exhausted():
+                return ''
+            # translations are joined with '|' and highlighted separately
+            for segment in (indexers.get(field) or '').split('|'):
+                spans = match_spans(segment, self.clauses)
+                if spans:
+                    return render(segment, spans, self.max_length)
+        return ''
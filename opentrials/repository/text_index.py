@@ -0,0 +1,139 @@
+"""
+Local inverted index of the text indexers of trial fossils.
+
+When a fossil is created, the values of its text indexers are split into
+accent folded, lower case terms and stored with their field and position in
+the FossilPosting table. Searches filter and rank fossils with subqueries on
+that table, so they need neither Solr nor LIKE scans on the indexers table.
+
+Query syntax: every word must match (AND) the start of a word (i.e. malar
+matches malaria) and "double quoted" words must match whole words, as a
+phrase. Unlike the icontains filters this replaces, text in the middle of a
+word (i.e. laria) matches nothing.
+"""
+
+import re
+import unicodedata
+
+from django.db.models import Q, Case, When, Value, IntegerField, Sum, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# indexers searched and their weight in the ranking of results
+FIELD_WEIGHTS = {
+    'trial_id': 10,
+    'utrn_number': 8,
+    'secondary_ids': 8,
+    'scientific_title': 5,
+    'public_title': 5,
+    'acronym': 4,
+    'scientific_acronym': 4,
+    'scientific_acronym_expansion': 3,
+    'hc_freetext': 2,
+    'i_freetext': 2,
+    'primary_sponsor': 2,
+    'scientific_contacts': 1,
+    }
+
+# Indexer values join translations with '|', so positions jump by this gap
+# between segments to avoid phrases matching across them
+SEGMENT_GAP = 100
+
+MAX_TERM_LENGTH = 64
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+def fold(text):
+    """Lower case text with accents removed (i.e. 'Ação' -> 'acao')"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokenize(text):
+    """Yields a (position, term) tuple for each word of an indexer value"""
+    if not text:
+        return
+
+    position = 0
+    for segment in fold(text).split('|'):
+        for word in WORD_RE.findall(segment):
+            yield position, word[:MAX_TERM_LENGTH]
+            position += 1
+        position += SEGMENT_GAP
+
+def parse_query(q):
+    """
+    Returns the clauses of a query, each one a tuple of terms to be found in
+    sequence. Words with punctuation (i.e. RBR-2abcd) are phrases of their
+    terms. Terms ending with * match by prefix, as all unquoted words do.
+    """
+    clauses = []
+    for phrase, word in QUERY_RE.findall(q):
+        terms = [term[:MAX_TERM_LENGTH] for term in WORD_RE.findall(fold(phrase or word))]
+        if not terms:
+            continue
+        if word:
+            terms = [term + '*' for term in terms]
+        clauses.append(tuple(terms))
+    return clauses
+
+def term_matches(term, value):
+    if term.endswith('*'):
+        return value.startswith(term[:-1])
+    return value == term
+
+def term_filter(term):
+    if term.endswith('*'):
+        return Q(term__startswith=term[:-1])
+    return Q(term=term)
+
+def field_weight():
+    return Case(*[When(field=field, then=Value(weight)) for field, weight in FIELD_WEIGHTS.items()],
+                default=Value(1), output_field=IntegerField())
+
+def occurrences(terms):
+    """
+    Postings where a clause occurs: those of its first term followed, in the
+    same field of the same fossil, by postings of each of its other terms.
+    """
+    from repository.models import FossilPosting
+
+    postings = FossilPosting.objects.filter(term_filter(terms[0]))
+    for i, term in enumerate(terms[1:], 1):
+        postings = postings.filter(Exists(FossilPosting.objects.filter(term_filter(term),
+                fossil=OuterRef('fossil'), field=OuterRef('field'), position=OuterRef('position') + i)))
+    return postings
+
+def clause_score(terms):
+    """Sum of the weights of the fields of the occurrences of a clause in a fossil"""
+    scores = occurrences(terms).filter(fossil=OuterRef('pk')).order_by().values('fossil')
+    scores = scores.annotate(score=Sum(field_weight())).values('score')
+    return Coalesce(Subquery(scores, output_field=IntegerField()), Value(0))
+
+def search(q, fossils):
+    """
+    Filters a queryset of fossils by a query (all its clauses must occur) and
+    orders it by the ``text_score`` it annotates, best matches first.
+    """
+    clauses = parse_query(q)
+    if not clauses:
+        return fossils.none()
+
+    for terms in clauses:
+        fossils = fossils.filter(pk__in=occurrences(terms).values('fossil'))
+
+    score = clause_score(clauses[0])
+    for terms in clauses[1:]:
+        score = score + clause_score(terms)
+
+    return fossils.annotate(text_score=score).order_by('-text_score', '-creation', '-pk')
+
+def index_fossil(fossil, values):
+    """Replaces the postings of a fossil by those of the given indexer values"""
+    from repository.models import FossilPosting
+
+    FossilPosting.objects.filter(fossil=fossil).delete()
+    FossilPosting.objects.bulk_create([
+        FossilPosting(fossil=fossil, field=field, term=term, position=position)
+        for field in FIELD_WEIGHTS
+        for position, term in tokenize(values.get(field))
+        ])
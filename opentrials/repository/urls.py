@@ -4,6 +4,7 @@ from repository.views import edit_trial_index, full_view, index, step_1, step_2,
 from repository.views import step_4, step_5, step_6, step_7, step_8, step_9, new_institution
 from repository.views import trial_registered, trial_view, recruiting, trial_ictrp, trial_otxml
 from repository.views import all_trials_ictrp, contacts, advanced_search, multi_otxml, custom_otcsv
+from repository.views import autocomplete
 
 urlpatterns = [
     path('edit/<int:trial_pk>/', edit_trial_index, name='repository.edittrial'),
@@ -22,6 +23,7 @@ urlpatterns = [
     # public
     path('recruiting/', recruiting, name='repository.recruiting'),
     path('advanced_search/', advanced_search, name='repository.advanced_search'),
+    path('autocomplete/', autocomplete, name='repository.autocomplete'),
     re_path(r'^(?P<trial_fossil_id>[0-9A-Za-z-]+)/$', trial_registered, name='repository.trial_registered'),
     re_path(r'^(?P<trial_fossil_id>[0-9A-Za-z-]+)/xml/ictrp/$', trial_ictrp, name='repository.trial_ictrp'),
     re_path(r'^(?P<trial_fossil_id>[0-9A-Za-z-]+)/xml/ot/$', trial_otxml, name='repository.trial_otxml'),
@@ -3,12 +3,12 @@
 from django.core import serializers
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import HttpResponseRedirect, HttpResponse, Http404
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from django.forms.models import inlineformset_factory
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
 from django.db.models import Q
 from django.conf import settings
 from django.template.defaultfilters import slugify
@@ -17,6 +17,11 @@ from django.core.paginator import Paginator, InvalidPage, EmptyPage
 from django.contrib import messages
 from django.utils.translation import get_language
 from django.utils.encoding import smart_str
+from django.utils.safestring import mark_safe
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.template.loader import render_to_string
+from django.core.cache import cache
 
 from reviewapp.models import Attachment, Submission, Remark
 from reviewapp.models import STATUS_PENDING, STATUS_RESUBMIT, STATUS_DRAFT, STATUS_APPROVED
@@ -25,6 +30,12 @@ from reviewapp.consts import STEP_STATES, REMARK, MISSING, PARTIAL, COMPLETE
 from reviewapp.views import submission_edit_published, send_opentrials_email
 
 from repository.trial_validation import trial_validator
+from repository.fossil_cache import get_object_fossil
+from repository.page_cache import attachments_version, attachments_modified, trial_page_key, trial_page_etag
+from repository.page_cache import timestamp, TRIAL_PAGE_CACHE_TIMEOUT
+from repository.autocomplete import prefix_index, MAX_RESULTS
+from repository.snippets import Highlighter
+from repository.text_index import fold
 from repository.models import ClinicalTrial, Descriptor, TrialNumber
 from repository.models import TrialSecondarySponsor, TrialSupportSource, Outcome
 from repository.models import PublicContact, ScientificContact, SiteContact, Contact, Institution
@@ -42,21 +53,29 @@ from repository.trds_forms import make_site_contact_form, TRIAL_FORMS
 from vocabulary.models import RecruitmentStatus, VocabularyTranslation, CountryCode, InterventionCode
 from vocabulary.models import StudyPurpose, InterventionAssigment, StudyMasking, StudyAllocation
 from vocabulary.models import MailMessage, InstitutionType
+from vocabulary.snapshot import get_snapshot as get_vocabulary_snapshot
+
+from haystack.exceptions import SearchBackendError
+try:
+    from pysolr import SolrError
+except ImportError: # other search backends
+    SolrError = IOError
 
 from polyglot.multilingual_forms import modelformset_factory
 
 from fossil.fields import DictKeyAttribute
 from fossil.models import Fossil
 
-from utilities import user_in_group, normalize_age, denormalize_age
+from utilities import user_in_group, normalize_age, denormalize_age, serve_file, iter_zip
 
 import datetime
+import json
+from hashlib import md5
 
 import choices
 import settings
 import csv
-import io
-from zipfile import ZipFile, ZIP_DEFLATED
+import os
 
 EXTRA_FORMS = 1
 
@@ -78,19 +97,7 @@ def localized_vocabulary(model_instance, language, *args):
     if not args:
         args = ['pk', 'description', 'label']
 
-    model_qs = model_instance.objects.all()
-    localized_list = model_qs.values(*args)
-    for item in localized_list:
-        try:
-            t = VocabularyTranslation.objects.get_translation_for_object(
-                                language, model=model_instance,
-                                object_id=item['pk'])
-            if t.description:
-                item['description'] = t.description
-        except ObjectDoesNotExist:
-            pass
-
-    return localized_list
+    return get_vocabulary_snapshot().localized(model_instance, language, args)
 
 def is_outdate(ct):
 
@@ -402,6 +409,100 @@ def get_humanizer(language_code, min_age_unit, max_age_unit):
 
     return humanize_search_values
 
+SEARCH_BACKEND_ERRORS = (IOError, SolrError, SearchBackendError)
+
+FACET_COUNTS_KEY = 'repository:facet_counts:%s'
+FACET_COUNTS_CACHE_TIMEOUT = 60 * 5
+
+# faceted fields of the search index and the GET parameter filtering each one
+SEARCH_FACETS = (
+    ('rec_status', 'rec_status', _('Recruitment Status')),
+    ('rec_country', 'rec_country', _('Recruitment Country')),
+    ('i_type', 'i_type', _('Institution type')),
+    ('gender', 'gender', _('Inclusion Gender')),
+    ('is_observational', 'is_observ', _('Study Type')),
+    )
+
+# facet values are shown as in the advanced search form: the terms of these
+# vocabularies by their descriptions, the other values by these labels
+FACET_VOCABULARIES = {
+    'rec_status': RecruitmentStatus,
+    'rec_country': CountryCode,
+    'i_type': InstitutionType,
+    }
+FACET_LABELS = {
+    'gender': {'both': _('both'), 'female': _('female'), 'male': _('male')},
+    'is_observational': {'true': _('Observational'), 'false': _('Interventional')},
+    }
+
+def search_facet_counts(q):
+    """
+    Number of published trials matching ``q`` by value of each faceted field,
+    as a dictionary (field -> {value: count}), or None if the search backend
+    failed. Counts are cached for FACET_COUNTS_CACHE_TIMEOUT seconds, so
+    renders of the search form don't query the backend each time.
+    """
+    key = FACET_COUNTS_KEY % md5(fold(q).encode('utf-8')).hexdigest()
+    facet_counts = cache.get(key)
+    if facet_counts is not None:
+        return facet_counts
+
+    fields = [field for field, param, title in SEARCH_FACETS]
+    if not q or getattr(settings, 'SEARCH_TEXT_IN_DATABASE', False):
+        counts = ClinicalTrial.fossils.database_facet_counts(
+                ClinicalTrial.fossils.published_database(q=q))
+    else:
+        try:
+            counts = ClinicalTrial.fossils.published_advanced(q=q, facets=fields).facet_counts()
+        except SEARCH_BACKEND_ERRORS:
+            return None
+        if not any(counts.values()):
+            # a backend failing silently returns no facets at all
+            return None
+
+    facet_counts = dict((field, dict((str(value).lower() if isinstance(value, bool) else value, count)
+                                     for value, count in counts.get(field, [])))
+                        for field in fields)
+    cache.set(key, facet_counts, FACET_COUNTS_CACHE_TIMEOUT)
+    return facet_counts
+
+def facet_links(request, facet_counts):
+    """
+    Returns a list of (title, values) tuples, one for each faceted field,
+    with the label and count of results of each value and the URL narrowing
+    the current search to it.
+    """
+    vocabulary = get_vocabulary_snapshot()
+    language = request.LANGUAGE_CODE
+
+    facets = []
+    for field, param, title in SEARCH_FACETS:
+        values = []
+        for value, count in facet_counts.get(field, []):
+            if not count:
+                continue
+            value = str(value).lower() if isinstance(value, bool) else value
+
+            if field in FACET_VOCABULARIES:
+                term = vocabulary.get_by_label(FACET_VOCABULARIES[field], value)
+                label = term.translated(language, 'description') if term else value
+            else:
+                label = FACET_LABELS.get(field, {}).get(value, value)
+
+            query = request.GET.copy()
+            query.pop('page', None)
+            query.setlist(param, [value])
+
+            values.append({'value': value,
+                           'label': label,
+                           'count': count,
+                           'url': '?' + query.urlencode(),
+                           'selected': value in request.GET.getlist(param)})
+        if values:
+            facets.append((title, values))
+
+    return facets
+
 def index(request):
     ''' List all registered trials
         If you use a search term, the result is filtered
@@ -442,9 +543,18 @@ def index(request):
             filters['minimum_recruitment_age__lte'] = normalize_age(200, 'Y')
 
 
-    object_list = ClinicalTrial.fossils.published_advanced(q=q, **filters)
+    # searches without text are indexed scans in the database, as are text
+    # searches of registries without a search backend
+    database_search = not q or getattr(settings, 'SEARCH_TEXT_IN_DATABASE', False)
+    if database_search:
+        results = ClinicalTrial.fossils.published_database(q=q, **filters)
+        object_list = results.proxies(language=request.LANGUAGE_CODE,
+                                      highlighter=Highlighter(q) if q else None)
+    else:
+        results = ClinicalTrial.fossils.published_advanced(q=q, snippets=True,
+                facets=[field for field, param, title in SEARCH_FACETS], **filters)
+        object_list = results.proxies(language=request.LANGUAGE_CODE)
     unsubmiteds = Submission.objects.filter(title__icontains=q).filter(Q(status='draft') | Q(status='resubmit')).order_by('-updated')
-    object_list = object_list.proxies(language=request.LANGUAGE_CODE)
     paginator = Paginator(object_list, getattr(settings, 'PAGINATOR_CT_PER_PAGE', 10))
 
     try:
@@ -457,6 +567,12 @@ def index(request):
     except (EmptyPage, InvalidPage):
         objects = paginator.page(paginator.num_pages)
 
+    if database_search:
+        facets = facet_links(request, ClinicalTrial.fossils.database_facet_counts(results))
+    else:
+        # the facet counts came with the hits of the current page
+        facets = facet_links(request, results.facet_counts())
+
     search_humanizer = get_humanizer(request.LANGUAGE_CODE.lower(), minimum_age_unit, maximum_age_unit)
     search_filters = [search_humanizer(k, v)
                         for k, v in filters.items() if v]
@@ -469,8 +585,26 @@ def index(request):
                    'unsubmiteds':unsubmiteds,
                    'outdated_flag':settings.MEDIA_URL + 'media/img/admin/icon_error.gif',
                    'search_filters': dict(search_filters),
+                   'facets': facets,
                    })
 
+def autocomplete(request):
+    ''' Suggestions for the search box: trial ids, acronyms, sponsors and
+        titles with a word starting with the ``q`` parameter
+    '''
+    try:
+        limit = min(int(request.GET.get('limit', MAX_RESULTS)), MAX_RESULTS)
+    except ValueError:
+        limit = MAX_RESULTS
+
+    suggestions = [{'label': label, 'trial_id': trial_id, 'field': field}
+                   for label, trial_id, field in prefix_index.search(request.GET.get('q', ''), limit)]
+
+    response = HttpResponse(json.dumps(suggestions, separators=(',', ':')),
+                            content_type='application/json')
+    response['Cache-Control'] = 'max-age=60'
+    return response
+
 @login_required
 def trial_view(request, trial_pk):
     ''' show details of a trial of a user logged '''
@@ -511,84 +645,36 @@ def trial_view(request, trial_pk):
     else:
         recruitment_label = ""
 
+    contact_fields = ('pk', 'firstname', 'middlename', 'lastname', 'address', 'city',
+                      'zip', 'country_id', 'telephone', 'email', 'affiliation__name')
+    recruitment_country_list = list(ct.recruitment_country.all().values('pk', 'description'))
+    scientific_contacts_list = list(ct.scientific_contacts().values(*contact_fields))
+    public_contacts_list = list(ct.public_contacts().values(*contact_fields))
+    site_contacts_list = list(ct.site_contact.all().values(*contact_fields))
+    contacts_lists = (scientific_contacts_list, public_contacts_list, site_contacts_list)
+
+    # gets the descriptions and translations of all countries at once
+    country_ids = [obj['country_id'] for contacts in contacts_lists for obj in contacts]
+    countries = CountryCode.objects.in_bulk(set(country_ids))
+    country_translations = VocabularyTranslation.objects.get_translations_for_objects(
+                                CountryCode, country_ids + [obj['pk'] for obj in recruitment_country_list],
+                                request.LANGUAGE_CODE.lower())
+
     # get translations for recruitment country
-    recruitment_country = ct.recruitment_country.all()
-    recruitment_country_list = recruitment_country.values('pk', 'description')
     for obj in recruitment_country_list:
-        try:
-            t = VocabularyTranslation.objects.get_translation_for_object(
-                                request.LANGUAGE_CODE.lower(), model=CountryCode,
-                                object_id=obj['pk'])
-            if t.description:
-                obj['description'] = t.description
-        except ObjectDoesNotExist:
-            pass
-
-    # get translations for scientific contacts country
-    scientific_contacts = ct.scientific_contacts()
-    scientific_contacts_list = scientific_contacts.values('pk', 'firstname', 'middlename',
-                            'lastname', 'address', 'city', 'zip', 'country_id', 'telephone',
-                            'email', 'affiliation__name')
-
-    for obj in scientific_contacts_list:
-        try:
-            country = CountryCode.objects.get(pk=obj['country_id'])
-            obj['country_description'] = country.description
-        except CountryCode.DoesNotExist:
-            obj['country_description'] = ""
-
-        try:
-            t = VocabularyTranslation.objects.get_translation_for_object(
-                                request.LANGUAGE_CODE.lower(), model=CountryCode,
-                                object_id=obj['country_id'])
-            if t.description:
+        t = country_translations.get(obj['pk'])
+        if t and t.description:
+            obj['description'] = t.description
+
+    # get translations for contacts country
+    for contacts in contacts_lists:
+        for obj in contacts:
+            country = countries.get(obj['country_id'])
+            obj['country_description'] = country.description if country else ""
+
+            t = country_translations.get(obj['country_id'])
+            if t and t.description:
                 obj['country_description'] = t.description
-        except ObjectDoesNotExist:
-            pass
-
-    # get translations for public contacts country
-    public_contacts = ct.public_contacts()
-    public_contacts_list = public_contacts.values('pk', 'firstname', 'middlename',
-                            'lastname', 'address', 'city', 'zip', 'country_id', 'telephone',
-                            'email', 'affiliation__name')
-
-    for obj in public_contacts_list:
-        try:
-            country = CountryCode.objects.get(pk=obj['country_id'])
-            obj['country_description'] = country.description
-        except CountryCode.DoesNotExist:
-            obj['country_description'] = ""
-
-        try:
-            t = VocabularyTranslation.objects.get_translation_for_object(
-                                request.LANGUAGE_CODE.lower(), model=CountryCode,
-                                object_id=obj['country_id'])
-            if t.description:
-                obj['country_description'] = t.description
-        except ObjectDoesNotExist:
-            pass
-
-    # get translations for site contacts country
-    site_contacts = ct.site_contact.all().select_related()
-    site_contacts_list = site_contacts.values('pk', 'firstname', 'middlename',
-                            'lastname', 'address', 'city', 'zip', 'country_id', 'telephone',
-                            'email', 'affiliation__name')
-
-    for obj in site_contacts_list:
-        try:
-            country = CountryCode.objects.get(pk=obj['country_id'])
-            obj['country_description'] = country.description
-        except CountryCode.DoesNotExist:
-            obj['country_description'] = ""
-
-        try:
-            t = VocabularyTranslation.objects.get_translation_for_object(
-                                request.LANGUAGE_CODE.lower(), model=CountryCode,
-                                object_id=obj['country_id'])
-            if t.description:
-                obj['country_description'] = t.description
-        except ObjectDoesNotExist:
-            pass
 
     enrollment_start_date = ct.enrollment_start_actual if \
         ct.enrollment_start_actual is not None else ct.enrollment_start_planned
@@ -632,7 +718,44 @@ def trial_registered(request, trial_fossil_id, trial_version=None):
         except Fossil.DoesNotExist:
             raise Http404
 
-    ct = fossil.get_object_fossil()
+    if len(trial_fossil_id) == 64:
+        trial_fossil_id = str(fossil).split(' ')[0]
+
+    # Each fossil is an immutable revision, so the page only changes with the
+    # language or when the trial attachments change
+    language = get_language()
+    attachs_version = attachments_version(trial_fossil_id)
+
+    etag = trial_page_etag(fossil.pk, language, attachs_version)
+    last_modified = max(int(timestamp(fossil.creation)),
+                        attachments_modified(attachs_version))
+    if not request.user.is_authenticated:
+        not_modified = get_conditional_response(request, etag=etag,
+                last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    cache_key = trial_page_key(fossil.pk, language, request.get_host(), attachs_version)
+    detail_body = cache.get(cache_key)
+
+    if detail_body is None:
+        detail_body = render_trial_registered_body(request, fossil, trial_fossil_id)
+        cache.set(cache_key, detail_body, TRIAL_PAGE_CACHE_TIMEOUT)
+
+    resp = render(request, 'repository/clinicaltrial_detail_published.html',
+                  {'detail_body': mark_safe(detail_body),
+                   'register_number': trial_fossil_id,
+                   })
+
+    if not request.user.is_authenticated:
+        resp['ETag'] = etag
+        resp['Last-Modified'] = http_date(last_modified)
+
+    return resp
+
+def render_trial_registered_body(request, fossil, trial_id):
+    """Renders the details of a published trial revision as a HTML fragment"""
+    ct = get_object_fossil(fossil)
     ct.fossil['language'] = ct.fossil.get('language', settings.DEFAULT_SUBMISSION_LANGUAGE)
     ct._language = ct.language
     ct.hash_code = fossil.pk
@@ -654,10 +777,7 @@ def trial_registered(request, trial_fossil_id, trial_version=None):
 
     created = datetime.datetime.strptime(ct.fossil['created'], "%Y-%m-%d %H:%M:%S")
 
-    if len(trial_fossil_id) == 64:
-        trial_fossil_id = str(fossil).split(' ')[0]
-
-    trial = get_object_or_404(ClinicalTrial, trial_id=trial_fossil_id)
+    trial = get_object_or_404(ClinicalTrial, trial_id=trial_id)
     attachs = [attach for attach in trial.trial_attach() if attach.public]
 
     try:
@@ -666,18 +786,17 @@ def trial_registered(request, trial_fossil_id, trial_version=None):
         time_perspective = None
     observational_study_design = trial.observational_study_design
 
-    return render(request, 'repository/clinicaltrial_detail_published.html', {'object': ct,
+    return render_to_string('repository/clinicaltrial_detail_published_body.html', {'object': ct,
                                 'attachs': attachs,
                                 'translations': translations,
                                 'time_perspective':time_perspective,
                                 'observational_study_design':observational_study_design,
                                 'host': request.get_host(),
                                 'fossil_created': created,
-                                'register_number': trial_fossil_id,
+                                'register_number': trial_id,
                                 'scientific_title': scientific_title,
-                                'languages': get_sorted_languages(request),
                                 'outdated_flag':settings.MEDIA_URL + 'media/img/admin/icon_error.gif',
-                                })
+                                }, request=request)
 
 @login_required
 def new_institution(request):
@@ -1209,7 +1328,8 @@ def step_9(request, trial_pk):
                                'default_second_language': ct.submission.get_secondary_language(),
                                'available_languages': [lang.lower() for lang in ct.submission.get_mandatory_languages()],})
 
-from repository.xml.generate import xml_ictrp, xml_opentrials
+from repository.xml.generate import xml_ictrp, iter_xml_ictrp, xml_opentrials, iter_xml_opentrials
+from repository.xml import dump as ictrp_dump
 
 def trial_ictrp(request, trial_fossil_id, trial_version=None):
     """
@@ -1235,7 +1355,7 @@ def trial_ictrp(request, trial_fossil_id, trial_version=None):
         except Fossil.DoesNotExist:
             raise Http404
 
-    ct = fossil.get_object_fossil()
+    ct = get_object_fossil(fossil)
     xml = xml_ictrp([fossil])
 
     resp = HttpResponse(xml,
@@ -1248,10 +1368,23 @@ def trial_ictrp(request, trial_fossil_id, trial_version=None):
 
 def all_trials_ictrp(request):
 
+    # Serves the pre-rendered dump when it is up to date (see build_ictrp_dump command)
+    dump_path = ictrp_dump.current_dump()
+    if dump_path is not None:
+        accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if accepts_gzip and os.path.exists(ictrp_dump.GZIP_DUMP_PATH):
+            resp = serve_file(request, ictrp_dump.GZIP_DUMP_PATH, 'text/xml', 'gzip')
+        else:
+            resp = serve_file(request, dump_path, 'text/xml')
+        patch_vary_headers(resp, ('Accept-Encoding',))
+        resp['Content-Disposition'] = 'attachment; filename=%s-ictrp.xml' % settings.TRIAL_ID_PREFIX
+        return resp
+
     trials = ClinicalTrial.fossils.published()
-    xml = xml_ictrp(trials)
 
-    resp = HttpResponse(xml,
+    # Renders and sends one trial at a time, so the response starts
+    # immediately and memory usage doesn't grow with the registry
+    resp = StreamingHttpResponse(iter_xml_ictrp(trials.iterator()),
             content_type='text/xml'
             )
 
@@ -1279,7 +1412,7 @@ def trial_otxml(request, trial_id, trial_version=None):
         except Fossil.DoesNotExist:
             raise Http404
 
-    ct = fossil.get_object_fossil()
+    ct = get_object_fossil(fossil)
     ct.hash_code = fossil.pk
     ct.previous_revision = fossil.previous_revision
     ct.version = fossil.revision_sequential
@@ -1300,69 +1433,89 @@ def multi_otxml(request):
     if not trial_id_list:
         return HttpResponse(status=205)
 
+    # with partial=1 unknown ids are reported in a header instead of a 404
+    partial = request.GET.get('partial') in ('1', 'true')
+
     ct_list = []
+    missing = []
 
-    for trial_id in trial_id_list:
-        try:
-            fossil = Fossil.objects.get(pk=trial_id)
-        except Fossil.DoesNotExist:
-            try:
-                qs = Fossil.objects.indexed(trial_id=trial_id)
-                fossil = qs.get(is_most_recent=True)
-            except Fossil.DoesNotExist:
+    for trial_id, fossil in ClinicalTrial.fossils.resolve(trial_id_list):
+        if fossil is None:
+            if not partial:
                 raise Http404
+            missing.append(trial_id)
+            continue
 
-        ct = fossil.get_object_fossil()
+        ct = get_object_fossil(fossil)
         ct.hash_code = fossil.pk
-        ct.previous_revision = fossil.previous_revision
         ct.version = fossil.revision_sequential
-        ct.status = fossil.indexers.key('status', fail_silent=True).value
+        ct.status = fossil._indexers.get('status')
 
         ct_list.append(ct)
 
-    xml = xml_opentrials(ct_list)
-
-    resp = HttpResponse(xml,
+    resp = StreamingHttpResponse(iter_xml_opentrials(ct_list),
             content_type='text/xml'
             )
 
     today = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')
     resp['Content-Disposition'] = 'attachment; filename=%s-ot.xml' % today
+    if missing:
+        resp['X-Missing-Trial-Ids'] = ','.join(missing)
 
     return resp
 
+class _CSVLine(object):
+    """Pseudo-buffer making csv.writer return each line instead of storing it"""
+    def write(self, value):
+        return value
+
+def _parse_date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d')
+
 def custom_otcsv(request):
-    allsubmissions = Submission.objects.all()
-    allsubmissions_list = allsubmissions.values('pk','trial_id','created','updated','creator','title','status')
+    submissions = Submission.objects.all()
 
-    today = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')
+    # optional filters: ?status=<status>&since=YYYY-MM-DD&until=YYYY-MM-DD
+    status_list = request.GET.getlist('status')
+    if status_list:
+        submissions = submissions.filter(status__in=status_list)
 
-    filename = "CustomCSV_OT_%s" % today
+    try:
+        since = request.GET.get('since', '').strip()
+        if since:
+            submissions = submissions.filter(created__gte=_parse_date(since))
+        until = request.GET.get('until', '').strip()
+        if until:
+            until = _parse_date(until) + datetime.timedelta(days=1)
+            submissions = submissions.filter(created__lt=until)
+    except ValueError:
+        return HttpResponse(status=400)
 
-    output = io.StringIO() ## temp output csv file
-    writer = csv.writer(output)
+    rows = submissions.values_list('trial', 'trial___deleted', 'trial__trial_id', 'created',
+                                   'updated', 'status', 'creator__username', 'title')
 
-    writer.writerow(['trial','created','updated','status','creator','title'])
+    today = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')
 
-    for submission in allsubmissions_list:
-        title = smart_str(submission['title'])
-        login_creator = User.objects.get(pk=submission['creator'])
+    filename = "CustomCSV_OT_%s" % today
 
-        try:
-            trial_id = ClinicalTrial.objects.get(pk=submission['trial_id'])
-            trial_id = str(trial_id).split(' ')[0]
-        except:
-            trial_id = "no_id"
+    def csv_lines():
+        writer = csv.writer(_CSVLine())
+        yield writer.writerow(['trial','created','updated','status','creator','title'])
 
-        writer.writerow([trial_id,submission['created'],submission['updated'],submission['status'],login_creator,title])
+        for trial_pk, trial_deleted, trial_id, created, updated, status, creator, title in rows.iterator():
+            # as ClinicalTrial.objects, deleted trials are not found
+            if trial_pk is None or trial_deleted:
+                trial_id = "no_id"
+            elif not trial_id:
+                trial_id = '(req:%s)' % trial_pk
 
-    response = HttpResponse(content_type='application/zip')
-    response['Content-Disposition'] = 'attachment; filename=%s.zip' % filename
+            yield writer.writerow([trial_id,created,updated,status,creator,smart_str(title)])
 
-    zipped_file = ZipFile(response, 'w', ZIP_DEFLATED)
+    chunks = (line.encode('utf-8') for line in csv_lines())
 
-    csv_name = '%s.csv' % filename
-    zipped_file.writestr(csv_name, output.getvalue())
+    response = StreamingHttpResponse(iter_zip('%s.csv' % filename, chunks),
+            content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename=%s.zip' % filename
 
     return response
 
@@ -1378,16 +1531,27 @@ def advanced_search(request):
     minimum_age_unit = request.GET.get('age_min_unit','').strip()
     maximum_age_unit = request.GET.get('age_max_unit','').strip()
 
-    recruitment_country_list = localized_vocabulary(CountryCode, request.LANGUAGE_CODE.lower())
-    recruitment_status_list = localized_vocabulary(RecruitmentStatus, request.LANGUAGE_CODE.lower())
-    institution_type_list = localized_vocabulary(InstitutionType, request.LANGUAGE_CODE.lower())
-
-    return render(request, 'repository/advanced_search.html', {'rec_countries':recruitment_country_list,
-                               'rec_status':recruitment_status_list,
-                               'i_type':institution_type_list,
+    facet_counts = search_facet_counts(q)
+
+    # the option lists come from a single vocabulary snapshot, with the number
+    # of trials matching the terms for each option (unless the backend failed)
+    vocabulary = get_vocabulary_snapshot()
+    options = {}
+    for field, model in (('rec_country', CountryCode),
+                         ('rec_status', RecruitmentStatus),
+                         ('i_type', InstitutionType)):
+        options[field] = vocabulary.localized(model, request.LANGUAGE_CODE.lower())
+        if facet_counts is not None:
+            for item in options[field]:
+                item['count'] = facet_counts[field].get(item['label'], 0)
+
+    return render(request, 'repository/advanced_search.html', {'rec_countries':options['rec_country'],
+                               'rec_status':options['rec_status'],
+                               'i_type':options['i_type'],
                                'q':q,
                                'age_min': minimum_age,
                                'age_max': maximum_age,
+                               'facet_counts': facet_counts,
                                'search_filters':{'rec_status':rec_status,
                                                  'rec_country':rec_country,
                                                  'is_observ':is_observational,
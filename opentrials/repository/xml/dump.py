@@ -0,0 +1,190 @@
+"""
+Pre-rendered ICTRP XML dump of all published trials.
+
+The dump is kept on disk as one XML fragment (a <trial> element) per trial,
+named after the trial id and the hash of the fossil it was rendered from:
+
+    ICTRP_DUMP_DIR/trials/<trial_id>--<fossil hash>.xml
+
+Refreshing the dump only renders the fragments of trials with a new most
+recent fossil, then the full document is assembled by concatenating the
+fragments into ICTRP_DUMP_DIR/ictrp.xml (and, optionally, ictrp.xml.gz).
+
+Once there is a dump, publishing a trial renders its fragment and marks the
+dump as dirty, so it is assembled again by the next request for it. The dump
+directory is not under MEDIA_ROOT, so it is only served through the view.
+"""
+
+import glob
+import gzip
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from fossil.models import FossilIndexer
+
+from repository.xml.generate import render_ictrp_trial, ICTRP_HEADER, ICTRP_FOOTER
+
+ICTRP_DUMP_DIR = getattr(settings, 'ICTRP_DUMP_DIR',
+        os.path.join(settings.PROJECT_PATH, 'ictrp_dump'))
+FRAGMENTS_DIR = os.path.join(ICTRP_DUMP_DIR, 'trials')
+DUMP_PATH = os.path.join(ICTRP_DUMP_DIR, 'ictrp.xml')
+GZIP_DUMP_PATH = DUMP_PATH + '.gz'
+DIRTY_PATH = os.path.join(ICTRP_DUMP_DIR, 'dirty') # fragments changed since assembled
+
+FRAGMENT_SEPARATOR = '--'
+
+def fragment_path(trial_id, fossil_pk):
+    return os.path.join(FRAGMENTS_DIR, '%s%s%s.xml' % (trial_id, FRAGMENT_SEPARATOR, fossil_pk))
+
+def existing_fragments():
+    """Returns a dictionary with paths of existing fragments by trial id"""
+    fragments = {}
+    for path in glob.glob(os.path.join(FRAGMENTS_DIR, '*.xml')):
+        name = os.path.basename(path)[:-len('.xml')]
+        trial_id, sep, fossil_pk = name.rpartition(FRAGMENT_SEPARATOR)
+        if sep:
+            fragments.setdefault(trial_id, []).append(path)
+    return fragments
+
+def trial_fragments(trial_id):
+    """Returns the paths of the existing fragments of a given trial"""
+    return glob.glob(os.path.join(FRAGMENTS_DIR, '%s%s*.xml' % (
+        glob.escape(trial_id), FRAGMENT_SEPARATOR)))
+
+def write_fragment(trial_id, fossil, old_paths=()):
+    """Renders the ICTRP fragment of a fossil, replacing the older ones of the trial"""
+    path = fragment_path(trial_id, fossil.pk)
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'wb') as fp:
+        fp.write(render_ictrp_trial(fossil).encode('utf-8'))
+    os.replace(tmp_path, path)
+
+    for old_path in old_paths:
+        if old_path != path and os.path.exists(old_path):
+            os.remove(old_path)
+
+    return path
+
+def mark_dirty():
+    open(DIRTY_PATH, 'w').close()
+
+def trial_published(trial_id, fossil):
+    """
+    Renders the fragment of the new fossil of a published trial and marks the
+    dump to be assembled again. Does nothing while there is no dump.
+    """
+    if not os.path.exists(DUMP_PATH):
+        return
+
+    try:
+        write_fragment(trial_id, fossil, trial_fragments(trial_id))
+        mark_dirty()
+    except OSError:
+        # publishing doesn't fail because of the dump, which isn't served
+        # while it lacks the trial (see current_dump)
+        pass
+
+def published_fossils_by_trial_id():
+    """Maps the trial id of each published trial to its most recent fossil hash"""
+    from repository.models import ClinicalTrial
+
+    published = ClinicalTrial.fossils.published()
+    indexers = FossilIndexer.objects.filter(key='trial_id', fossil__in=published)
+
+    return dict(indexers.values_list('value', 'fossil'))
+
+def refresh_fragments(full=False):
+    """
+    Renders the fragments of trials whose most recent fossil has none yet and
+    removes the fragments of trials that are not published anymore.
+
+    Returns a tuple with the number of rendered and removed fragments.
+    """
+    from repository.models import PublishedTrial
+
+    if not os.path.isdir(FRAGMENTS_DIR):
+        os.makedirs(FRAGMENTS_DIR)
+
+    published = published_fossils_by_trial_id()
+    fragments = existing_fragments()
+
+    stale = dict((fossil_pk, trial_id) for trial_id, fossil_pk in published.items()
+                 if full or not os.path.exists(fragment_path(trial_id, fossil_pk)))
+
+    rendered = 0
+    for fossil in PublishedTrial.objects.filter(pk__in=list(stale.keys())).iterator():
+        trial_id = stale[fossil.pk]
+        write_fragment(trial_id, fossil, fragments.get(trial_id, ()))
+        rendered += 1
+
+    removed = 0
+    for trial_id, paths in fragments.items():
+        if trial_id not in published:
+            for path in paths:
+                os.remove(path)
+                removed += 1
+
+    return rendered, removed
+
+def _temporary_path():
+    # unique, as the dump can be assembled by concurrent requests
+    fd, path = tempfile.mkstemp(suffix='.tmp', dir=ICTRP_DUMP_DIR)
+    os.close(fd)
+    return path
+
+def assemble(compress=True):
+    """Concatenates the fragments into the full ICTRP document"""
+    # cleared before reading the fragments, so one written meanwhile marks the
+    # dump as dirty again
+    try:
+        os.remove(DIRTY_PATH)
+    except FileNotFoundError:
+        pass
+
+    tmp_path = _temporary_path()
+
+    with open(tmp_path, 'wb') as dump:
+        dump.write(ICTRP_HEADER.encode('utf-8'))
+        for path in sorted(glob.glob(os.path.join(FRAGMENTS_DIR, '*.xml'))):
+            with open(path, 'rb') as fragment:
+                shutil.copyfileobj(fragment, dump)
+        dump.write(ICTRP_FOOTER.encode('utf-8'))
+
+    if compress:
+        tmp_gzip_path = _temporary_path()
+        with open(tmp_path, 'rb') as dump:
+            with gzip.open(tmp_gzip_path, 'wb') as compressed:
+                shutil.copyfileobj(dump, compressed)
+        os.replace(tmp_gzip_path, GZIP_DUMP_PATH)
+    elif os.path.exists(GZIP_DUMP_PATH):
+        os.remove(GZIP_DUMP_PATH)
+
+    os.replace(tmp_path, DUMP_PATH)
+
+    return DUMP_PATH
+
+def current_dump():
+    """
+    Returns the path of the assembled dump, assembling it again when trials
+    were published since, or None when there is no dump or it lacks a trial
+    published by a process that couldn't render its fragment.
+    """
+    from repository.models import ClinicalTrial
+
+    if not os.path.exists(DUMP_PATH):
+        return None
+
+    if os.path.exists(DIRTY_PATH):
+        assemble(compress=os.path.exists(GZIP_DUMP_PATH))
+
+    newest = ClinicalTrial.fossils.published().aggregate(newest=Max('creation'))['newest']
+    if newest is not None and os.path.getmtime(DUMP_PATH) < time.mktime(newest.timetuple()):
+        return None
+
+    return DUMP_PATH
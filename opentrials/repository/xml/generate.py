@@ -5,11 +5,13 @@ from django.conf import settings
 
 from repository import choices
 from repository.xml import OPENTRIALS_XML_VERSION
+from repository.fossil_cache import get_object_fossil
 from repository.templatetags.repository_tags import prep_label_for_xml
 
 from vocabulary.models import CountryCode, InterventionCode, StudyPurpose
 from vocabulary.models import InterventionAssigment, StudyMasking, StudyAllocation
 from vocabulary.models import StudyPhase, StudyType, RecruitmentStatus, InstitutionType
+from vocabulary.snapshot import get_snapshot as get_vocabulary_snapshot
 
 VALID_FUNCTIONS = (
     'xml_ictrp',
@@ -25,61 +27,121 @@ def formatted_institution_address(institution):
                     ] if i
         )
 
+def prepare_ictrp_trial(fossil, ct_fossil=None):
+    """Returns the context used by the ICTRP XML template for a given fossil."""
+    if ct_fossil is None:
+        ct_fossil = get_object_fossil(fossil)
+
+    trial = {}
+    trial['ct_fossil'] = ct_fossil
+    trial['public_contact'] = ct_fossil.public_contact if ct_fossil.public_contact \
+                                        else ct_fossil.scientific_contact
+    trial['primary_sponsor'] = formatted_institution_address(ct_fossil.primary_sponsor)
+    trial['secondary_sponsors'] = [formatted_institution_address(sponsor['institution'])
+                                    for sponsor in ct_fossil.secondary_sponsors]
+    trial['source_support'] = [formatted_institution_address(source['institution'])
+                                    for source in ct_fossil.support_sources]
+    trial['hash_code'] = fossil.pk
+    trial['version'] = fossil.revision_sequential
+
+    return trial
+
 def xml_ictrp(fossils, **kwargs):
     """Generates an ICTRP XML for a given Clinical Trial and returns as string."""
 
-    trials = []
-
-    for fossil in fossils:
-        trial = {}
-        ct_fossil = fossil.get_object_fossil()
-        trial['ct_fossil'] = ct_fossil
-        trial['public_contact'] = ct_fossil.public_contact if ct_fossil.public_contact \
-                                            else ct_fossil.scientific_contact
-        trial['primary_sponsor'] = formatted_institution_address(ct_fossil.primary_sponsor)
-        trial['secondary_sponsors'] = [formatted_institution_address(sponsor['institution'])
-                                        for sponsor in ct_fossil.secondary_sponsors]
-        trial['source_support'] = [formatted_institution_address(source['institution'])
-                                        for source in ct_fossil.support_sources]
-        trial['hash_code'] = fossil.pk
-        trial['previous_revision'] = fossil.previous_revision
-        trial['version'] = fossil.revision_sequential
-        trials.append(trial)
+    trials = [prepare_ictrp_trial(fossil) for fossil in fossils]
 
     return render_to_string(
             'repository/xml/all_xml_ictrp.xml', # old clinicaltrial_detail.xml
             {'trial_list': trials, 'reg_name': settings.REG_NAME},
             )
 
+ICTRP_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<trials>\n'
+ICTRP_FOOTER = '</trials>\n'
+
+def render_ictrp_trial(fossil):
+    """Renders the <trial> element of the ICTRP XML for a given fossil.
+
+    The fossil is decoded apart from the shared fossil cache, so dumping the
+    whole registry doesn't evict the trials being viewed on the site."""
+    ct_fossil = fossil.get_object_fossil(force_load=True)
+
+    return render_to_string(
+            'repository/xml/ictrp_trial.xml',
+            {'trial': prepare_ictrp_trial(fossil, ct_fossil), 'reg_name': settings.REG_NAME},
+            )
+
+def iter_xml_ictrp(fossils, **kwargs):
+    """Generates an ICTRP XML for the given fossils, yielding one trial at a time.
+
+    Only one trial is kept in memory, so it can be used to stream the whole
+    registry."""
+
+    yield ICTRP_HEADER
+
+    for fossil in fossils:
+        yield render_ictrp_trial(fossil)
+
+    yield ICTRP_FOOTER
+
+def prepare_opentrials_trial(trial):
+    """Returns the (trial, persons) pair used by the OpenTrials XML template."""
+    # the translations are copied, as the fossil data is shared through the
+    # fossil cache
+    translations = []
+    for translation in trial.translations:
+        translation = dict(translation)
+        translations.append(translation)
+
+        translation['primary_outcomes'] = []
+        for outcome in trial.primary_outcomes:
+            for out_trans in outcome['translations']:
+                if out_trans['language'] == translation['language']:
+                    translation['primary_outcomes'].append(out_trans)
+
+        translation['secondary_outcomes'] = []
+        for outcome in trial.secondary_outcomes:
+            for out_trans in outcome['translations']:
+                if out_trans['language'] == translation['language']:
+                    translation['secondary_outcomes'].append(out_trans)
+
+    trial.translations = translations
+
+    persons = set(trial.scientific_contact + trial.public_contact + trial.site_contact)
+
+    return (trial, persons)
+
+def opentrials_context(include_translations=True):
+    return {'default_language':settings.DEFAULT_SUBMISSION_LANGUAGE,
+            'reg_name': settings.REG_NAME,
+            'include_translations': include_translations,
+            'opentrials_xml_version': OPENTRIALS_XML_VERSION}
+
 def xml_opentrials(trials, include_translations=True, **kwargs):
     """Generates an Opentrials XML for a given Clinical Trial and returns as string."""
-    prepared_trials = []
-    for trial in trials:
-        for translation in trial.translations:
-            translation['primary_outcomes'] = []
-            for outcome in trial.primary_outcomes:
-                for out_trans in outcome['translations']:
-                    if out_trans['language'] == translation['language']:
-                        translation['primary_outcomes'].append(out_trans)
+    prepared_trials = [prepare_opentrials_trial(trial) for trial in trials]
 
-            translation['secondary_outcomes'] = []
-            for outcome in trial.secondary_outcomes:
-                for out_trans in outcome['translations']:
-                    if out_trans['language'] == translation['language']:
-                        translation['secondary_outcomes'].append(out_trans)
+    context = opentrials_context(include_translations)
+    context['object_list'] = prepared_trials
 
-        persons = set(trial.scientific_contact + trial.public_contact + trial.site_contact)
+    return render_to_string('repository/xml/xml_opentrials.xml', context)
 
-        prepared_trials.append( (trial, persons) )
+OPENTRIALS_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<!DOCTYPE trials SYSTEM "http://localhost:8000/xml/opentrials.dtd">\n'
+                     '<trials version="%s">\n')
+OPENTRIALS_FOOTER = '</trials>\n'
 
-    return render_to_string(
-            'repository/xml/xml_opentrials.xml',
-            {'object_list': prepared_trials,
-             'default_language':settings.DEFAULT_SUBMISSION_LANGUAGE,
-             'reg_name': settings.REG_NAME,
-             'include_translations': include_translations,
-             'opentrials_xml_version': OPENTRIALS_XML_VERSION},
-            )
+def iter_xml_opentrials(trials, include_translations=True, **kwargs):
+    """Generates an Opentrials XML for the given trials, yielding one trial at a time."""
+    context = opentrials_context(include_translations)
+
+    yield OPENTRIALS_HEADER % OPENTRIALS_XML_VERSION
+
+    for trial in trials:
+        context['object'], context['persons'] = prepare_opentrials_trial(trial)
+        yield render_to_string('repository/xml/opentrials_trial.xml', context)
+
+    yield OPENTRIALS_FOOTER
 
 MOD_TEMPLATE = """<!-- ===========================================================================
 File: opentrials-vocabularies.mod
@@ -97,6 +159,7 @@ such as those from Vocabulary application.
 def xml_opentrials_mod(**kwargs):
     """Generates the MOD file with valid vocabularies for Opentrials XML standard."""
     entities = []
+    vocabulary = get_vocabulary_snapshot()
 
     # Languages
     #entities.append('\n'.join([
@@ -112,7 +175,7 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Intervention codes
-    icodes = map(prep_label_for_xml, InterventionCode.objects.values_list('label', flat=True))
+    icodes = map(prep_label_for_xml, vocabulary.labels(InterventionCode))
     entities.append('\n'.join([
             '<!-- TRDS 13: intervention descriptor attributes -->',
             '<!-- attribute options cannot contain slashes "/" -->',
@@ -122,7 +185,7 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Study statuses
-    statuses = map(prep_label_for_xml, RecruitmentStatus.objects.values_list('label', flat=True))
+    statuses = map(prep_label_for_xml, vocabulary.labels(RecruitmentStatus))
     entities.append('\n'.join([
             '<!ENTITY % requirementstatus.options',
             '    "%s">' % '|'.join(statuses),
@@ -141,7 +204,7 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Purposes
-    purposes = map(prep_label_for_xml, StudyPurpose.objects.values_list('label', flat=True))
+    purposes = map(prep_label_for_xml, vocabulary.labels(StudyPurpose))
     entities.append('\n'.join([
             '<!-- TRDS 15b: study_design attributes -->',
             '<!ENTITY % purpose.options',
@@ -149,28 +212,28 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Assignment
-    assignments = map(prep_label_for_xml, InterventionAssigment.objects.values_list('label', flat=True))
+    assignments = map(prep_label_for_xml, vocabulary.labels(InterventionAssigment))
     entities.append('\n'.join([
             '<!ENTITY % assignment.options',
             '    "%s">' % '|'.join(assignments),
             ]))
 
     # Masking
-    maskings = map(prep_label_for_xml, StudyMasking.objects.values_list('label', flat=True))
+    maskings = map(prep_label_for_xml, vocabulary.labels(StudyMasking))
     entities.append('\n'.join([
             '<!ENTITY % masking.options',
             '    "%s">' % '|'.join(maskings),
             ]))
 
     # Allocation
-    allocations = map(prep_label_for_xml, StudyAllocation.objects.values_list('label', flat=True))
+    allocations = map(prep_label_for_xml, vocabulary.labels(StudyAllocation))
     entities.append('\n'.join([
             '<!ENTITY % allocation.options',
             '    "%s">' % '|'.join(allocations),
             ]))
 
     # Phases
-    phases = map(prep_label_for_xml, StudyPhase.objects.values_list('label', flat=True))
+    phases = map(prep_label_for_xml, vocabulary.labels(StudyPhase))
     entities.append('\n'.join([
             '<!-- TRDS 15c -->',
             '<!ENTITY % phase.options',
@@ -184,7 +247,7 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Countries
-    countries = CountryCode.objects.values_list('label', flat=True)
+    countries = vocabulary.labels(CountryCode)
     entities.append('\n'.join([
             '<!ENTITY % country.options',
             '    "%s">' % '|'.join(countries),
@@ -198,14 +261,14 @@ def xml_opentrials_mod(**kwargs):
             ]))
 
     # Study Types
-    study_types = map(prep_label_for_xml, StudyType.objects.values_list('label', flat=True))
+    study_types = map(prep_label_for_xml, vocabulary.labels(StudyType))
     entities.append('\n'.join([
             '<!ENTITY % study_type.options',
             '    "%s">' % '|'.join(study_types),
             ]))
 
     # Institution Types
-    institution_types = map(prep_label_for_xml, InstitutionType.objects.values_list('label', flat=True))
+    institution_types = map(prep_label_for_xml, vocabulary.labels(InstitutionType))
     entities.append('\n'.join([
             '<!ENTITY % institution_type.options',
             '    "%s">' % '|'.join(institution_types),
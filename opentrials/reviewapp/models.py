@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, post_init
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes import generic
@@ -69,6 +69,8 @@ class Submission(ControlledDeletion):
     created = models.DateTimeField(default=datetime.now, editable=False)
     updater = models.ForeignKey(User, null=True, related_name='submission_updater', editable=False)
     updated = models.DateTimeField(null=True, editable=False)
+    # last change of the public attachments, shown on the page of the trial
+    attachments_updated = models.DateTimeField(null=True, editable=False)
     title = models.TextField('Scientific title', max_length=2000)
     primary_sponsor = models.ForeignKey(Institution, null=True, blank=True,
                                     verbose_name=_('Primary Sponsor'))
@@ -287,3 +289,20 @@ def create_user_profile(sender, instance,**kwargs):
     UserProfile.objects.get_or_create(user=instance)
 
 post_save.connect(create_user_profile, sender=User)
+
+def attachment_post_init(sender, instance, **kwargs):
+    instance._was_public = instance.__dict__.get('public', False)
+
+def attachment_changed(sender, instance, **kwargs):
+    # Public attachments are shown on the page of the published trial, so
+    # its cached page must be rendered again
+    if not (instance.public or instance._was_public):
+        return
+
+    Submission.objects.filter(pk=instance.submission_id).update(attachments_updated=datetime.now())
+
+    instance._was_public = instance.public
+
+post_init.connect(attachment_post_init, sender=Attachment)
+post_save.connect(attachment_changed, sender=Attachment)
+post_delete.connect(attachment_changed, sender=Attachment)
@@ -3,7 +3,6 @@ from django.http import Http404, HttpResponse
 from reviewapp.models import UserProfile, REMARK_TRANSITIONS, Remark
 from registration.models import RegistrationProfile
 from django.urls import reverse
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.paginator import Paginator, InvalidPage, EmptyPage
 from django.shortcuts import render_to_response, get_object_or_404
 from django.template import loader, Context
@@ -139,18 +138,15 @@ def submissions_list(request):
 
     def objects_with_title_translated():
         # TODO for #125: Change this to a better solution
+        translations = ClinicalTrialTranslation.objects.get_translations_for_objects(
+                ClinicalTrial, [obj['trial__pk'] for obj in submission_list],
+                request.LANGUAGE_CODE.lower())
         for obj in submission_list:
             if obj['trial__scientific_title']:
                 obj['title'] = obj['trial__scientific_title']
-            try:
-                #t = obj.trial.translations.get(language=request.LANGUAGE_CODE)
-                t = ClinicalTrialTranslation.objects.get_translation_for_object(
-                        request.LANGUAGE_CODE.lower(), model=ClinicalTrial, object_id=obj['trial__pk'],
-                        )
-                if t.scientific_title != '':
-                    obj['title'] = t.scientific_title
-            except ObjectDoesNotExist:
-                pass
+            t = translations.get(obj['trial__pk'])
+            if t and t.scientific_title != '':
+                obj['title'] = t.scientific_title
 
             # Forces a safe truncate
             obj['short_title'] = safe_truncate(obj['title'], 120)
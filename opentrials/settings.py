@@ -216,6 +216,21 @@ FIXTURE_DIRS = ('fixtures',)
 
 PAGINATOR_CT_PER_PAGE = 10
 
+# Maximum size (in characters of serialized JSON) of the in-process cache of
+# deserialized trial fossils (see repository/fossil_cache.py)
+FOSSIL_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+# Runs text searches of trials on the local inverted index of the database
+# (see repository/text_index.py) instead of the search backend
+SEARCH_TEXT_IN_DATABASE = False
+
+# Timeout (in seconds) of the cached pages of published trials
+TRIAL_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Timeout (in seconds) of the cached "no translation" results of polyglot
+# (see polyglot/models.py)
+POLYGLOT_NEGATIVE_CACHE_TIMEOUT = 60 * 10
+
 TWITTER = 'ensaiosclinicos'
 TWITTER_TIMEOUT = 18000 # expires in 5 min
 
@@ -231,6 +246,10 @@ FORMAT_MODULE_PATH = 'formats'
 # Backup directory
 BACKUP_DIR = os.path.join(MEDIA_ROOT, 'backup')
 
+# Directory of the pre-rendered ICTRP dump (see build_ictrp_dump command).
+# Keep it out of MEDIA_ROOT, the dump must only be served by its view
+ICTRP_DUMP_DIR = os.path.join(PROJECT_PATH, 'ictrp_dump')
+
 INTERNAL_IPS = ('127.0.0.1',)
 USE_ETAGS = True
 
@@ -19,8 +19,14 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-from django.http import HttpResponse
+import os
+import re
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from django.http import HttpResponse, StreamingHttpResponse
 from django.core import serializers
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 ELLIPSIS = '\u2026'
 
@@ -76,6 +82,101 @@ def export_json(modeladmin, request, queryset):
     return response
 export_json.short_description = 'Export selected records in JSON format'
 
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+FILE_CHUNK_SIZE = 64 * 1024
+
+def _read_file_range(fp, length, chunk_size=FILE_CHUNK_SIZE):
+    try:
+        while length > 0:
+            chunk = fp.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fp.close()
+
+def serve_file(request, path, content_type, content_encoding=None):
+    """
+    Returns a streaming response for a static file, with conditional GET
+    (ETag/Last-Modified) and single byte range support.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    mtime = int(stat.st_mtime)
+    etag = '"%x-%x"' % (mtime, size)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return not_modified
+
+    start, end, status = 0, size - 1, 200
+
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', ''))
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if match and any(match.groups()) and (not if_range or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+
+        if start >= size or start > end:
+            resp = HttpResponse(status=416)
+            resp['Content-Range'] = 'bytes */%d' % size
+            return resp
+        status = 206
+
+    fp = open(path, 'rb')
+    fp.seek(start)
+
+    resp = StreamingHttpResponse(_read_file_range(fp, end - start + 1),
+            content_type=content_type, status=status)
+    resp['Content-Length'] = str(end - start + 1)
+    resp['Accept-Ranges'] = 'bytes'
+    resp['ETag'] = etag
+    resp['Last-Modified'] = http_date(mtime)
+    if status == 206:
+        resp['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+    if content_encoding:
+        resp['Content-Encoding'] = content_encoding
+
+    return resp
+
+class _ZipStreamBuffer(object):
+    """Unseekable file-like object collecting the bytes written by ZipFile"""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_zip(filename, chunks, compression=ZIP_DEFLATED):
+    """
+    Compresses an iterable of byte strings into a zip archive with a single
+    entry named ``filename``, yielding the archive bytes as they are produced
+    so that it never needs to be kept in memory.
+    """
+    buf = _ZipStreamBuffer()
+    with ZipFile(buf, 'w', compression) as zipped_file:
+        with zipped_file.open(filename, 'w', force_zip64=True) as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                data = buf.pop()
+                if data:
+                    yield data
+    yield buf.pop()
+
 def user_in_group(user, group):
     return user.groups.filter(name=group).count() != 0 if user else False
 
@@ -99,6 +200,27 @@ def denormalize_age(hours, unit):
                                }
     return hours / hour_to_age_multipliers[unit]
 
+def age_limits(agemin_value, agemin_unit, agemax_value, agemax_unit):
+    """
+    Returns the (minimum, maximum) inclusion ages of a trial in hours, as
+    searched: no minimum is 0 and no maximum is 200 years.
+    """
+    if agemin_unit != '-' and agemin_value is not None:
+        minimum = normalize_age(agemin_value, agemin_unit)
+    else:
+        minimum = 0
+
+    if agemax_unit != '-' and agemax_value is not None:
+        maximum = normalize_age(agemax_value, agemax_unit)
+    else:
+        maximum = normalize_age(200, 'Y')
+
+    return minimum, maximum
+
+def search_gender(gender):
+    "inclusion gender as searched: 'male', 'female' or 'both'"
+    return {'M': 'male', 'F': 'female'}.get(gender, 'both')
+
 if __name__=='__main__':
     import doctest
     doctest.testmod()
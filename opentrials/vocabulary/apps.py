@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class VocabularyConfig(AppConfig):
+    name = 'vocabulary'
+
+    def ready(self):
+        from vocabulary.models import connect_vocabulary_signals
+        connect_vocabulary_signals()
@@ -1,12 +1,15 @@
 ############################################ Controlled Vocabularies ###
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes import generic
 from django.utils import simplejson
 
 from polyglot.models import Translation
 
+from vocabulary import snapshot
+
 class SimpleVocabularyManager(models.Manager):
     def get_by_natural_key(self, label):
         return self.get(label=label)
@@ -147,3 +150,18 @@ class AttachmentType(SimpleVocabulary):
 
 class InstitutionType(SimpleVocabulary):
     ''' Categories for types of institutions '''
+
+# SIGNALS
+
+def vocabulary_changed(sender, **kwargs):
+    # Terms and translations changed in any way (including by loaddata, with
+    # raw=True) make every process load a new snapshot, once committed
+    transaction.on_commit(snapshot.bump_version)
+
+def connect_vocabulary_signals():
+    # connected to each model, so other models keep Django's fast deletes;
+    # called once the app registry is ready (see vocabulary.apps)
+    for model in snapshot.vocabulary_models() + [VocabularyTranslation]:
+        uid = 'vocabulary_changed_%s' % model._meta.model_name
+        post_save.connect(vocabulary_changed, sender=model, dispatch_uid=uid + '_save')
+        post_delete.connect(vocabulary_changed, sender=model, dispatch_uid=uid + '_delete')
@@ -0,0 +1,150 @@
+"""
+Immutable in-process snapshot of the controlled vocabularies.
+
+All terms of every SimpleVocabulary model and their translations in all
+languages are loaded with one query per model plus a single query for the
+translations, so lookups by pk, label and language are dictionary hits.
+
+Saving (or deleting) a term or a translation, loaddata included, bumps a
+version number kept in the cache (see the signals in vocabulary.models); each
+process checks it at most every CHECK_INTERVAL seconds and loads a new
+snapshot when it changed.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.apps import apps
+from django.core.cache import cache
+from django.contrib.contenttypes.models import ContentType
+
+from polyglot.models import lang_format
+
+VERSION_KEY = 'vocabulary:snapshot:version'
+CHECK_INTERVAL = 5 # seconds
+
+TermTranslation = namedtuple('TermTranslation', 'label description')
+
+class Term(namedtuple('Term', 'pk label description order translations')):
+    """A vocabulary term, with its translations by language ('pt-br' -> TermTranslation)"""
+
+    def translated(self, language, field):
+        """
+        Value of a field in a language, or the original one when there is no
+        translation or it is blank.
+        """
+        translation = self.translations.get(lang_format(language))
+        return getattr(translation, field, None) or getattr(self, field)
+
+class VocabularySnapshot(object):
+    def __init__(self, terms_by_model):
+        self._terms = MappingProxyType(dict(
+                (model, tuple(terms)) for model, terms in terms_by_model.items()))
+        self._by_pk = MappingProxyType(dict(
+                (model, MappingProxyType(dict((term.pk, term) for term in terms)))
+                for model, terms in self._terms.items()))
+        self._by_label = MappingProxyType(dict(
+                (model, MappingProxyType(dict((term.label, term) for term in terms)))
+                for model, terms in self._terms.items()))
+
+    def terms(self, model):
+        """Terms of a vocabulary, in the ordering of its model"""
+        return self._terms.get(model, ())
+
+    def get(self, model, pk):
+        return self._by_pk.get(model, {}).get(pk)
+
+    def get_by_label(self, model, label):
+        return self._by_label.get(model, {}).get(label)
+
+    def labels(self, model):
+        return [term.label for term in self.terms(model)]
+
+    def localized(self, model, language, fields=('pk', 'description', 'label')):
+        """
+        Returns a new list of dictionaries with the given fields of the terms
+        of a vocabulary, their descriptions translated to a language.
+        """
+        localized = []
+        for term in self.terms(model):
+            item = dict((field, getattr(term, field)) for field in fields)
+            if 'description' in item:
+                item['description'] = term.translated(language, 'description')
+            localized.append(item)
+        return localized
+
+def vocabulary_models():
+    from vocabulary.models import SimpleVocabulary
+    return [model for model in apps.get_app_config('vocabulary').get_models()
+            if issubclass(model, SimpleVocabulary)]
+
+def load_snapshot():
+    from vocabulary.models import VocabularyTranslation
+
+    models = vocabulary_models()
+    content_types = ContentType.objects.get_for_models(*models)
+    model_by_ct = dict((ct.pk, model) for model, ct in content_types.items())
+
+    translations = {} # (model, pk) -> {language: TermTranslation}
+    rows = VocabularyTranslation.objects.filter(content_type__in=list(model_by_ct.keys()))
+    for ct_id, object_id, language, label, description in rows.values_list(
+            'content_type', 'object_id', 'language', 'label', 'description'):
+        translations.setdefault((model_by_ct[ct_id], object_id), {})[lang_format(language)] = \
+                TermTranslation(label, description)
+
+    terms_by_model = {}
+    for model in models:
+        terms_by_model[model] = [
+            Term(pk, label, description, order,
+                 MappingProxyType(translations.get((model, pk), {})))
+            for pk, label, description, order in model.objects.values_list(
+                    'pk', 'label', 'description', 'order')]
+
+    return VocabularySnapshot(terms_by_model)
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # starts from the current time, so an evicted version is never reused
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+def bump_version():
+    """Makes every process load a new snapshot"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        get_version()
+
+class SnapshotHolder(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked = 0
+
+    def get(self):
+        now = time.time()
+        if self._snapshot is not None and now - self._checked < CHECK_INTERVAL:
+            return self._snapshot
+
+        with self._lock:
+            version = get_version()
+            if self._snapshot is None or version != self._version:
+                self._snapshot = load_snapshot()
+                self._version = version
+            self._checked = now
+            return self._snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+_holder = SnapshotHolder()
+
+def get_snapshot():
+    """Returns the current VocabularySnapshot of this process"""
+    return _holder.get()